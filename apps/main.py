@@ -5,7 +5,13 @@ from datetime import datetime
 from utils.ffmpeg_checker import check_ffmpeg, setup_ffmpeg_warning
 from utils.story_generator import StoryGenerator
 from utils.tts_handler import generate_tts_sync, TTS_AVAILABLE, get_supported_languages
-from utils.video_editor import VideoEditor, MOVIEPY_AVAILABLE
+from utils.video_editor import VideoEditor, MOVIEPY_AVAILABLE, STANDARD_FPS, RENDITIONS, get_frame_size
+from utils.media_ingest import media_ingest
+from utils.encode_profiles import ENCODE_PROFILES, DEFAULT_ENCODE_PROFILE
+from utils.size_target import PLATFORM_LIMITS
+from utils.media_probe import has_audio_stream
+from utils.audio_track import audio_track_cache
+from utils.quality_target import QUALITY_TARGETS
 from utils.speech_to_text import speech_to_text
 from utils.content_optimizer import content_optimizer
 from utils.text_effects import get_text_effect_config, preview_text_effect
@@ -23,6 +29,8 @@ if 'uploaded_files' not in st.session_state:
     st.session_state.uploaded_files = []
 if 'audio_path' not in st.session_state:
     st.session_state.audio_path = None
+if 'narration_download' not in st.session_state:
+    st.session_state.narration_download = None
 if 'video_path' not in st.session_state:
     st.session_state.video_path = None
 if 'background_music_path' not in st.session_state:
@@ -33,6 +41,8 @@ if 'video_mode' not in st.session_state:
     st.session_state.video_mode = 'video'
 if 'selected_text_effect' not in st.session_state:
     st.session_state.selected_text_effect = 'none'
+if 'job_report' not in st.session_state:
+    st.session_state.job_report = {}
 
 # Initialize story generator
 story_generator = StoryGenerator()
@@ -41,7 +51,7 @@ class VideoGeneratorApp:
     def __init__(self):
         pass
 
-    def render_file_upload(self):
+    def render_file_upload(self, settings):
         """Render file upload section"""
         st.header("📁 Upload Media")
         uploaded_files = st.file_uploader(
@@ -54,6 +64,10 @@ class VideoGeneratorApp:
         if uploaded_files:
             st.session_state.uploaded_files = uploaded_files
             st.success(f"✅ {len(uploaded_files)} file diupload!")
+
+            # Normalize uploads to the output size/fps in the background, once per asset
+            width, height = get_frame_size(settings['video_format'])
+            media_ingest.prefetch(uploaded_files, width, height, STANDARD_FPS)
             
             for file in uploaded_files:
                 if file.type.startswith('image'):
@@ -231,6 +245,15 @@ class VideoGeneratorApp:
         else:
             auto_subtitle = False
         
+        # A/B test: render every story option over the same media in one pass
+        render_all_stories = False
+        if not auto_subtitle and len(st.session_state.story_options) > 1:
+            render_all_stories = st.checkbox(
+                f"Render semua {len(st.session_state.story_options)} opsi cerita (A/B test)",
+                help="Media hanya didekode sekali lalu dibagi ke setiap varian",
+                key="render_all_stories_checkbox"
+            )
+
         # Mode selection
         st.subheader("🎯 Pilih Mode Video")
         
@@ -296,6 +319,7 @@ class VideoGeneratorApp:
             try:
                 # Determine audio source
                 audio_path = None
+                narration_download = None
                 transcribed_text = None
                 
                 if auto_subtitle and has_video_upload:
@@ -303,23 +327,23 @@ class VideoGeneratorApp:
                     status_text.text("🔊 Mengekstrak audio dari video yang diunggah...")
                     video_file = next(f for f in st.session_state.uploaded_files if f.type.startswith('video'))
                     
-                    # Extract audio from video
+                    # The upload itself is the narration source: the editor stream-copies its
+                    # audio into the output instead of round-tripping it through MP3
                     import tempfile
                     temp_video_path = os.path.join(tempfile.gettempdir(), f"temp_video_{uuid.uuid4().hex[:8]}_{video_file.name}")
                     with open(temp_video_path, 'wb') as f:
                         f.write(video_file.getvalue())
                     
-                    from moviepy.editor import VideoFileClip
-                    video_clip = VideoFileClip(temp_video_path)
-                    if video_clip.audio:
-                        audio_path = os.path.join(tempfile.gettempdir(), f"extracted_audio_{uuid.uuid4().hex[:8]}.mp3")
-                        video_clip.audio.write_audiofile(audio_path, codec='mp3', verbose=False, logger=None)
-                    else:
+                    if not has_audio_stream(temp_video_path):
                         st.error("❌ Video tidak memiliki audio untuk transkripsi")
-                        video_clip.close()
                         return
-                    
-                    video_clip.close()
+                    audio_path = temp_video_path
+                    # The narration download gets the audio stream only: copied when it is AAC,
+                    # otherwise encoded once (cached per upload)
+                    try:
+                        narration_download = (audio_track_cache.extract(temp_video_path), 'm4a', 'audio/mp4')
+                    except Exception as e:
+                        st.warning(f"⚠️ Audio narasi tidak dapat disiapkan untuk diunduh: {str(e)}")
                     
                     # Extract text from video audio
                     status_text.text("🎤 Mengekstrak teks dari audio video...")
@@ -331,10 +355,20 @@ class VideoGeneratorApp:
                         st.error("❌ Gagal mengekstrak teks dari audio video")
                         return
                 
+                elif render_all_stories:
+                    status_text.text("🔊 Menghasilkan narasi untuk setiap opsi cerita...")
+                    variants = [
+                        (story, generate_tts_sync(story, settings['language']))
+                        for story in st.session_state.story_options
+                    ]
+                    audio_path = variants[st.session_state.selected_story_index][1]
+                    narration_download = (audio_path, 'mp3', 'audio/mpeg')
+
                 else:
                     # Generate TTS seperti biasa
                     status_text.text("🔊 Menghasilkan narasi audio...")
                     audio_path = generate_tts_sync(st.session_state.story_text, settings['language'])
+                    narration_download = (audio_path, 'mp3', 'audio/mpeg')
                 
                 progress_bar.progress(33)
                 
@@ -343,26 +377,90 @@ class VideoGeneratorApp:
                     return
                 
                 st.session_state.audio_path = audio_path
+                st.session_state.narration_download = narration_download
                 
                 status_text.text("🎬 Langkah 2: Membuat video dengan karaoke...")
                 
                 # Use the selected mode dengan auto-subtitle dan effects
-                video_path = VideoEditor().create_video(
-                    media_files=st.session_state.uploaded_files,
-                    audio_path=audio_path,
-                    duration=settings['duration'],
-                    video_format=settings['video_format'],
-                    subtitle_text=st.session_state.story_text,
-                    font_size=settings['font_size'],
-                    text_color=settings['text_color'],
-                    text_position=settings['text_position'],
-                    background_music=st.session_state.background_music_path,
-                    music_volume=settings['music_volume'],
-                    mode=video_mode,
-                    auto_subtitle=auto_subtitle,
-                    subtitle_language=settings['language'],
-                    text_effect=selected_effect
-                )
+                video_editor = VideoEditor()
+                st.session_state.extra_outputs = []
+                if render_all_stories:
+                    variant_paths = video_editor.create_variants(
+                        media_files=st.session_state.uploaded_files,
+                        variants=variants,
+                        duration=settings['duration'],
+                        video_format=settings['video_format'],
+                        font_size=settings['font_size'],
+                        text_color=settings['text_color'],
+                        text_position=settings['text_position'],
+                        background_music=st.session_state.background_music_path,
+                        music_volume=settings['music_volume'],
+                        mode=video_mode,
+                        text_effect=selected_effect,
+                        encode_profile=settings['encode_profile'],
+                        quality=settings['render_quality']
+                    )
+                    video_path = variant_paths[st.session_state.selected_story_index]
+                    st.session_state.extra_outputs = [
+                        (f"Opsi {i + 1}", path) for i, path in enumerate(variant_paths) if path != video_path
+                    ]
+                elif settings['renditions'] and not auto_subtitle:
+                    rendition_paths = video_editor.create_renditions(
+                        media_files=st.session_state.uploaded_files,
+                        audio_path=audio_path,
+                        duration=settings['duration'],
+                        renditions=settings['renditions'],
+                        subtitle_text=st.session_state.story_text,
+                        font_size=settings['font_size'],
+                        text_color=settings['text_color'],
+                        text_position=settings['text_position'],
+                        background_music=st.session_state.background_music_path,
+                        music_volume=settings['music_volume'],
+                        mode=video_mode,
+                        text_effect=selected_effect,
+                        encode_profile=settings['encode_profile'],
+                        quality=settings['render_quality']
+                    )
+                    video_path = next(iter(rendition_paths.values()))
+                    st.session_state.extra_outputs = [
+                        (name, path) for name, path in rendition_paths.items() if path != video_path
+                    ]
+                else:
+                    preview_slot = st.empty()
+
+                    def show_preview(partial_path, seconds):
+                        with open(partial_path, 'rb') as partial_file:
+                            preview_slot.video(partial_file.read())
+                        status_text.text(f"▶️ Pratinjau: {seconds:.0f} detik pertama sudah ter-render...")
+
+                    video_path = video_editor.create_video(
+                        media_files=st.session_state.uploaded_files,
+                        audio_path=audio_path,
+                        duration=settings['duration'],
+                        video_format=settings['video_format'],
+                        subtitle_text=st.session_state.story_text,
+                        font_size=settings['font_size'],
+                        text_color=settings['text_color'],
+                        text_position=settings['text_position'],
+                        background_music=st.session_state.background_music_path,
+                        music_volume=settings['music_volume'],
+                        mode=video_mode,
+                        auto_subtitle=auto_subtitle,
+                        subtitle_language=settings['language'],
+                        text_effect=selected_effect,
+                        render_backend=settings['render_backend'],
+                        subtitle_mode=settings['subtitle_mode'],
+                        workers=settings['workers'],
+                        segment_seconds=settings['segment_seconds'],
+                        encode_profile=settings['encode_profile'],
+                        quality=settings['render_quality'],
+                        segment_cache=settings['segment_cache'],
+                        preview_callback=show_preview if settings['progressive_preview'] else None,
+                        size_limit=settings['size_limit'],
+                        quality_target=settings['quality_target']
+                    )
+                    preview_slot.empty()
+                    video_editor.check_size_target(video_path)
                 progress_bar.progress(66)
                 
                 if not video_path or not os.path.exists(video_path):
@@ -371,6 +469,7 @@ class VideoGeneratorApp:
                 
                 st.session_state.video_path = video_path
                 st.session_state.video_mode = video_mode
+                st.session_state.job_report = video_editor.job_report
                 
                 status_text.text("📊 Langkah 3: Mengoptimasi konten...")
                 try:
@@ -445,6 +544,24 @@ class VideoGeneratorApp:
                     st.error(f"❌ Error memuat preview video: {str(e)}")
             else:
                 st.error("❌ File video tidak ditemukan")
+
+            # Other story variants or renditions of the same job
+            for i, (label, path) in enumerate(st.session_state.get('extra_outputs') or []):
+                if not path or not os.path.exists(path):
+                    continue
+                with open(path, 'rb') as extra_file:
+                    st.download_button(
+                        label=f"📥 Download {label}",
+                        data=extra_file.read(),
+                        file_name=f"video_{label.replace(':', 'x')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4",
+                        mime="video/mp4",
+                        use_container_width=True,
+                        key=f"download_extra_btn_{i}"
+                    )
+
+            if st.session_state.get('job_report'):
+                with st.expander("📈 Laporan Render"):
+                    st.json(st.session_state.job_report)
         
         with col2:
             st.subheader("📄 Download Assets")
@@ -484,16 +601,18 @@ Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                     key="download_content_btn"
                 )
             
-            if st.session_state.audio_path and os.path.exists(st.session_state.audio_path):
+            narration = st.session_state.narration_download
+            if narration and os.path.exists(narration[0]):
+                narration_path, narration_ext, narration_mime = narration
                 try:
-                    with open(st.session_state.audio_path, "rb") as f:
+                    with open(narration_path, "rb") as f:
                         audio_bytes = f.read()
                     
                     st.download_button(
                         label="🔊 Download Audio Narasi",
                         data=audio_bytes,
-                        file_name=f"audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3",
-                        mime="audio/mpeg",
+                        file_name=f"audio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{narration_ext}",
+                        mime=narration_mime,
                         use_container_width=True,
                         key="download_audio_btn"
                     )
@@ -586,6 +705,83 @@ Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                     value=0.2,
                     step=0.1,
                     key="music_volume_slider"
+                ),
+                'render_backend': st.selectbox(
+                    "Mesin render:",
+                    ['moviepy', 'ffmpeg'],
+                    format_func=lambda x: "MoviePy (standar)" if x == 'moviepy' else "FFmpeg/libass (cepat)",
+                    key="render_backend_select"
+                ),
+                'subtitle_mode': st.selectbox(
+                    "Mode subtitle:",
+                    ['burn', 'soft', 'overlay'],
+                    format_func=lambda x: {
+                        'burn': "Tertanam di video (burn-in)",
+                        'soft': "Track subtitle MP4 (tanpa render ulang)",
+                        'overlay': "Lapisan teks transparan (dapat dipakai ulang)",
+                    }[x],
+                    key="subtitle_mode_select"
+                ),
+                'renditions': st.multiselect(
+                    "Rendisi (rasio/resolusi) sekaligus:",
+                    list(RENDITIONS),
+                    default=[],
+                    help="Kosongkan untuk satu video sesuai format. Media didekode sekali, audio di-encode sekali.",
+                    key="renditions_multiselect"
+                ),
+                'render_quality': st.radio(
+                    "Kualitas render:",
+                    ['final', 'draft'],
+                    format_func=lambda x: "Final (resolusi penuh)" if x == 'final' else "Draft (360p, cepat)",
+                    key="render_quality_radio"
+                ),
+                'encode_profile': st.selectbox(
+                    "Profil encode:",
+                    list(ENCODE_PROFILES.keys()),
+                    index=list(ENCODE_PROFILES.keys()).index(DEFAULT_ENCODE_PROFILE),
+                    format_func=lambda x: ENCODE_PROFILES[x]['name'],
+                    key="encode_profile_select"
+                ),
+                'size_limit': st.selectbox(
+                    "Batas ukuran file:",
+                    [None] + list(PLATFORM_LIMITS),
+                    format_func=lambda x: "Tanpa batas" if x is None else PLATFORM_LIMITS[x]['name'],
+                    key="size_limit_select"
+                ),
+                'quality_target': st.selectbox(
+                    "Target kualitas (CRF otomatis):",
+                    [None] + list(QUALITY_TARGETS),
+                    format_func=lambda x: "Sesuai profil" if x is None else QUALITY_TARGETS[x]['name'],
+                    help="Uji-encode beberapa potongan video dan pilih CRF termurah yang masih memenuhi SSIM.",
+                    key="quality_target_select"
+                ),
+                'workers': st.slider(
+                    "Jumlah proses render paralel:",
+                    min_value=1,
+                    max_value=max(1, os.cpu_count() or 1),
+                    value=1,
+                    key="render_workers_slider"
+                ),
+                'segment_seconds': st.slider(
+                    "Panjang segmen render (detik):",
+                    min_value=2,
+                    max_value=20,
+                    value=4,
+                    step=2,
+                    key="segment_seconds_slider"
+                ),
+                'segment_cache': st.checkbox(
+                    "Gunakan ulang segmen yang tidak berubah",
+                    value=False,
+                    help="Video dirender per segmen GOP tertutup lalu disambung (struktur GOP berubah); "
+                         "segmen disimpan di cache disk dan dipakai ulang pada render berikutnya.",
+                    key="segment_cache_checkbox"
+                ),
+                'progressive_preview': st.checkbox(
+                    "Pratinjau progresif saat render",
+                    value=False,
+                    help="Video diputar sebelum render selesai (render satu tahap, tanpa cache segmen)",
+                    key="progressive_preview_checkbox"
                 )
             }
             return settings
@@ -603,7 +799,7 @@ Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         tab1, tab2, tab3, tab4 = st.tabs(["📁 Upload Media", "📖 Generate Cerita", "🎬 Buat Video", "📊 Hasil"])
         
         with tab1:
-            self.render_file_upload()
+            self.render_file_upload(settings)
         with tab2:
             self.render_story_generator(settings)
         with tab3:
@@ -0,0 +1,79 @@
+"""
+Keyframe-index trims on closed- and open-GOP uploads: frame count and timing at the copy/re-encode seam
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.keyframe_index import keyframe_index
+from utils.media_ingest import MediaIngest, MAX_CLIP_SECONDS, MEZZANINE_VIDEO_ARGS
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg not installed")
+
+WIDTH, HEIGHT, FPS = 320, 240, 30
+# 2.4 s GOPs: the 10 s cut falls 0.4 s after the keyframe at 9.6 s
+GOP_FRAMES = 72
+CLIP_SECONDS = 12
+
+
+def _fixture(path, x264_params):
+    subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-f', 'lavfi',
+         '-i', f"testsrc2=size={WIDTH}x{HEIGHT}:rate={FPS}:duration={CLIP_SECONDS}",
+         '-c:v', 'libx264', '-preset', 'veryfast', '-g', str(GOP_FRAMES), '-bf', '3',
+         '-x264-params', x264_params, '-pix_fmt', 'yuv420p', str(path)],
+        check=True
+    )
+    return str(path)
+
+
+def _frames(path):
+    """Decoded luma planes in presentation order"""
+    result = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', str(path), '-map', '0:v:0',
+         '-f', 'rawvideo', '-pix_fmt', 'gray', '-fps_mode', 'passthrough', '-'],
+        capture_output=True, check=True
+    )
+    return np.frombuffer(result.stdout, dtype='uint8').reshape(-1, HEIGHT, WIDTH).astype('int16')
+
+
+def _assert_aligned(source, output):
+    """Every output frame is the source frame with the same index, not a neighbour"""
+    assert len(output) == MAX_CLIP_SECONDS * FPS
+    for index, frame in enumerate(output):
+        errors = {i: np.abs(frame - source[i]).mean() for i in (index - 1, index, index + 1) if 0 <= i < len(source)}
+        assert min(errors, key=errors.get) == index, f"frame {index} ({index / FPS:.3f}s) is shifted"
+
+
+def test_closed_gop_copies_whole_gops(tmp_path):
+    source = _fixture(tmp_path / 'closed.mp4', 'open-gop=0:scenecut=0')
+    output = tmp_path / 'out.mp4'
+    report = keyframe_index.trim(source, str(output), MAX_CLIP_SECONDS, MEZZANINE_VIDEO_ARGS)
+
+    assert report['copied_seconds'] == 9.6
+    assert report['re_encoded_seconds'] == 0.4
+    _assert_aligned(_frames(source), _frames(output))
+
+
+def test_open_gop_keyframes_are_not_cut_points(tmp_path):
+    source = _fixture(tmp_path / 'open.mp4', 'open-gop=1:scenecut=0')
+    keyframes = keyframe_index.keyframes(source)
+
+    # Leading B-frames of every keyframe after the first follow it in decode order
+    assert all(index < before for _, index, before in keyframes[1:])
+    with pytest.raises(ValueError):
+        keyframe_index.trim(source, str(tmp_path / 'out.mp4'), MAX_CLIP_SECONDS, MEZZANINE_VIDEO_ARGS)
+
+
+def test_open_gop_upload_keeps_every_frame(tmp_path):
+    source = _fixture(tmp_path / 'open.mp4', 'open-gop=1:scenecut=0')
+    output = tmp_path / 'out.mp4'
+    MediaIngest._normalize_video(source, str(output), WIDTH, HEIGHT, FPS)
+
+    _assert_aligned(_frames(source), _frames(output))
@@ -0,0 +1,59 @@
+"""
+Final audio tracks encoded to AAC once and cached by a hash of their inputs, so every render
+of a job (final, draft, re-renders) muxes the same file by stream copy
+"""
+import os
+import logging
+
+from utils.render_cache import RenderCache, hash_file
+from utils.ffmpeg_renderer import ffmpeg_renderer, run_ffmpeg
+from utils.media_probe import can_stream_copy_audio
+
+logger = logging.getLogger(__name__)
+
+# Bump when the mixing or encoding changes so stale tracks are not reused
+AUDIO_VERSION = 1
+AUDIO_SAMPLE_RATE = 44100
+
+
+class AudioTrackCache:
+    def __init__(self):
+        self.cache = RenderCache('audio')
+
+    def key(self, sources, *settings):
+        """Key of a track: content hashes of its source files (None for unused ones) plus the mix settings"""
+        hashes = [hash_file(path) if path else None for path in sources]
+        return self.cache.key(hashes, *settings, AUDIO_SAMPLE_RATE, AUDIO_VERSION)
+
+    def get(self, key):
+        """Cached AAC track for key, or None"""
+        return self.cache.get(key, '.m4a')
+
+    def store(self, key, producer):
+        """Run producer(output_path), which writes the AAC track, and cache the result under key"""
+        path = self.cache.store(key, '.m4a', producer)
+        logger.info("Cached audio track %s (%.1f KB)", os.path.basename(path), os.path.getsize(path) / 1024)
+        return path
+
+    def store_clip(self, key, audio):
+        """Encode a MoviePy audio clip to AAC (written straight to the cache, no temp file in cwd)"""
+        return self.store(key, lambda output_path: audio.write_audiofile(
+            output_path, fps=AUDIO_SAMPLE_RATE, codec='aac', verbose=False, logger=None
+        ))
+
+    def extract(self, source_path):
+        """First audio stream of source_path alone as AAC: stream-copied when it already is AAC,
+        otherwise encoded once and cached like any other track"""
+        copy = can_stream_copy_audio(source_path)
+        key = self.key([source_path], 'extract', 'copy' if copy else 'encode')
+        cached = self.get(key)
+        if cached:
+            return cached
+        codec_args = ['-c:a', 'copy'] if copy else ffmpeg_renderer.audio_codec_args + ['-ar', AUDIO_SAMPLE_RATE]
+        return self.store(key, lambda output_path: run_ffmpeg(
+            ['-i', source_path, '-map', '0:a:0', '-vn'] + codec_args + [output_path]
+        ))
+
+
+# Singleton instance
+audio_track_cache = AudioTrackCache()
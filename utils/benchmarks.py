@@ -0,0 +1,400 @@
+"""
+Render benchmarks
+
+    python -m utils.benchmarks encoders [--duration 6] [--profiles fast,hevc]
+    python -m utils.benchmarks blit [--frames 200]
+    python -m utils.benchmarks yuv [--duration 6] [--profile fast]
+    python -m utils.benchmarks ingest [--megapixels 12]
+    python -m utils.benchmarks trim [--duration 14] [--gop 3]
+"""
+import os
+import time
+import uuid
+import shutil
+import io
+import argparse
+import subprocess
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from utils.encode_profiles import ENCODE_PROFILES, ffmpeg_video_args
+from utils.ffmpeg_renderer import run_ffmpeg, filter_path
+from utils.parallel_render import cpu_seconds
+from utils.subtitle_writer import build_ass_script, resolve_font_family
+from utils.text_effects import get_text_effect_config
+from utils.text_processor import text_processor
+from utils.text_renderer import render_text, text_style
+
+BENCHMARK_TEXT = (
+    "Di sebuah desa kecil, seorang anak menemukan peta tua. "
+    "Peta itu menunjuk ke gua di balik air terjun, tempat harta karun disembunyikan!"
+)
+
+
+def synthetic_timelines(work_dir, width, height, duration):
+    """Fixed set of (name, mode, fps, ffmpeg input args) covering the app's timeline shapes"""
+    timings = text_processor.create_punctuation_aware_karaoke(BENCHMARK_TEXT, duration)
+    script = build_ass_script(
+        timings, width, height, 60, 'white', 'middle', get_text_effect_config('glow'), 'glow'
+    )
+    subtitle_path = os.path.join(work_dir, 'karaoke.ass')
+    with open(subtitle_path, 'w', encoding='utf-8') as f:
+        f.write(script)
+    _, fonts_dir = resolve_font_family('Arial-Bold', 60)
+    ass_filter = f"ass=filename={filter_path(subtitle_path)}"
+    if fonts_dir:
+        ass_filter += f":fontsdir={filter_path(fonts_dir)}"
+
+    return [
+        # Black background with burned-in karaoke (text_only mode)
+        ('text_only', 'text_only', 24, [
+            '-f', 'lavfi', '-i', f"color=c=black:s={width}x{height}:r=24:d={duration},{ass_filter}"
+        ]),
+        # Still images changing every few seconds (image slideshow)
+        ('stills', 'video', 15, [
+            '-f', 'lavfi', '-i', f"testsrc2=s={width}x{height}:r=1/3:d={duration},fps=15"
+        ]),
+        # Full-frame motion (video uploads)
+        ('motion', 'video', 15, [
+            '-f', 'lavfi', '-i', f"testsrc2=s={width}x{height}:r=15:d={duration}"
+        ]),
+    ]
+
+
+def benchmark_encoders(duration=6.0, width=1080, height=1920, profiles=None):
+    """Encode every synthetic timeline under every profile; returns a list of result dicts"""
+    profiles = profiles or list(ENCODE_PROFILES.keys())
+    work_dir = os.path.join(tempfile.gettempdir(), f"bench_{uuid.uuid4().hex[:8]}")
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    try:
+        for name, mode, fps, input_args in synthetic_timelines(work_dir, width, height, duration):
+            for profile in profiles:
+                output_path = os.path.join(work_dir, f"{name}_{profile}.mp4")
+                wall_start, cpu_start = time.perf_counter(), cpu_seconds()
+                try:
+                    run_ffmpeg(input_args + ffmpeg_video_args(profile, fps, mode) + ['-an', output_path])
+                except RuntimeError as e:
+                    results.append({'timeline': name, 'profile': profile, 'error': str(e)})
+                    continue
+                results.append({
+                    'timeline': name,
+                    'profile': profile,
+                    'wall_time': round(time.perf_counter() - wall_start, 3),
+                    'cpu_seconds': round(cpu_seconds() - cpu_start, 3),
+                    'size_kb': round(os.path.getsize(output_path) / 1024, 1),
+                })
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _float_blend_full_copy(base, bitmap, x, y):
+    """Previous overlay path: copy the whole frame, float32 blend over the bitmap box"""
+    frame = np.array(base, dtype='uint8')
+    region = frame[y:y + bitmap.h, x:x + bitmap.w]
+    alpha = bitmap.alpha[:, :, None].astype('float32') / 255.0
+    region[...] = (bitmap.rgb.astype('float32') * alpha + region * (1.0 - alpha)).astype('uint8')
+    return frame
+
+
+def benchmark_blit(frames=200, width=1080, height=1920, text='Karaoke!', effect='glow'):
+    """Per-frame cost of drawing one word over a full frame with each compositing strategy"""
+    from moviepy.editor import ImageClip, CompositeVideoClip
+    from utils.karaoke_overlay import KaraokeOverlayClip
+
+    bitmap = render_text(text, 'Arial-Bold', 60, text_style(get_text_effect_config(effect), '#FFFFFF'))
+    base = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype='uint8')
+    x, y = (width - bitmap.w) // 2, int(height * 0.3)
+
+    word = ImageClip(bitmap.rgb).set_mask(ImageClip(bitmap.alpha / 255.0, ismask=True))
+    composite = CompositeVideoClip([ImageClip(base), word.set_position((x, y))], size=(width, height))
+    overlay = KaraokeOverlayClip(ImageClip(base).set_duration(1), [(0, 1, bitmap, (x, y))])
+
+    strategies = [
+        ('CompositeVideoClip (full-frame mask)', lambda: composite.get_frame(0)),
+        ('float32 box blend + frame copy', lambda: _float_blend_full_copy(base, bitmap, x, y)),
+        ('uint16 premultiplied text band', lambda: overlay.frame_parts(base, 0)),
+    ]
+    reference = _float_blend_full_copy(base, bitmap, x, y).astype('int16')
+    results = []
+    for name, draw in strategies:
+        output = draw()
+        started = time.perf_counter()
+        for _ in range(frames):
+            draw()
+        frame = np.concatenate(output) if isinstance(output, list) else output
+        results.append({
+            'strategy': name,
+            'ms_per_frame': round((time.perf_counter() - started) * 1000 / frames, 3),
+            # Largest per-channel deviation from the float blend (rounding only)
+            'max_diff': int(np.abs(frame.astype('int16') - reference).max()),
+        })
+
+    baseline = results[0]['ms_per_frame']
+    for row in results:
+        row['speedup'] = round(baseline / row['ms_per_frame'], 1) if row['ms_per_frame'] else None
+    return results
+
+
+def _karaoke_overlays(width, height, duration, effect='glow', font_size=60):
+    """(start, end, TextBitmap, position) list for BENCHMARK_TEXT, as the text_only mode builds it"""
+    from utils.text_renderer import WordAtlas
+
+    atlas = WordAtlas()
+    style = text_style(get_text_effect_config(effect), '#FFFFFF')
+    return [
+        (timing['start_time'], timing['end_time'],
+         atlas.get(timing['text'], font_size, style, max_width=width * 0.9), ('center', height * 0.3))
+        for timing in text_processor.create_punctuation_aware_karaoke(BENCHMARK_TEXT, duration)
+    ]
+
+
+def _swscale_yuv420p(rgb):
+    """ffmpeg's own rgb24 -> yuv420p conversion of one frame, as a flat uint8 array"""
+    height, width = rgb.shape[:2]
+    result = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+         '-s', f"{width}x{height}", '-i', '-', '-f', 'rawvideo', '-pix_fmt', 'yuv420p', '-'],
+        input=np.ascontiguousarray(rgb).tobytes(), stdout=subprocess.PIPE, check=True,
+    )
+    return np.frombuffer(result.stdout, dtype='uint8')
+
+
+def benchmark_yuv(duration=6.0, width=1080, height=1920, profile='fast'):
+    """text_only render through the rgb24 pipe (swscale converts every frame) vs the yuv420p compositor"""
+    from moviepy.editor import ColorClip
+    from utils.frame_pipeline import frame_pipeline
+    from utils.karaoke_overlay import KaraokeOverlayClip
+    from utils.yuv_compositor import YUVOverlayClip
+
+    fps = 24
+    overlays = _karaoke_overlays(width, height, duration)
+    base = ColorClip(size=(width, height), color=np.zeros(3, dtype='uint8')).set_duration(duration)
+    clips = [('rgb24 + swscale', KaraokeOverlayClip(base, overlays)), ('yuv420p planes', YUVOverlayClip(base, overlays))]
+
+    # Accuracy: the yuv420p compositor against swscale converting the RGB composite
+    t = overlays[0][0]
+    reference = _swscale_yuv420p(clips[0][1].get_frame(t)).astype('int16')
+    background = clips[1][1].pipeline_stages()[0].get_frame(t)
+    planes = np.concatenate([p.ravel() for p in clips[1][1].yuv_parts(background, t)]).astype('int16')
+    # Chroma differs only at glyph edges: swscale downsamples with its own filter, not a 2x2 mean
+    diff = np.abs(planes - reference)
+    luma_diff, chroma_diff = int(diff[:width * height].max()), int(diff[width * height:].max())
+
+    work_dir = os.path.join(tempfile.gettempdir(), f"bench_{uuid.uuid4().hex[:8]}")
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    try:
+        for output in ('null', profile):
+            for name, clip in clips:
+                if output == 'null':
+                    # No encoder: isolates the pipe plus (for rgb24) the conversion to yuv420p
+                    video_args, output_path = ['-pix_fmt', 'yuv420p', '-f', 'null'], '-'
+                else:
+                    video_args = ffmpeg_video_args(profile, fps, 'text_only')
+                    output_path = os.path.join(work_dir, f"{getattr(clip, 'pix_fmt', 'rgb24')}.mp4")
+                wall_start, cpu_start = time.perf_counter(), cpu_seconds()
+                report = frame_pipeline.write(clip, output_path, fps, video_args)
+                wall_time = time.perf_counter() - wall_start
+                results.append({
+                    'path': name,
+                    'output': output,
+                    'wall_time': round(wall_time, 3),
+                    'cpu_seconds': round(cpu_seconds() - cpu_start, 3),
+                    'ms_per_frame': round(wall_time * 1000 / report['frames'], 2),
+                    'composite_ms': round(report['stages']['composite']['busy_time'] * 1000 / report['frames'], 3),
+                    'max_diff_y': luma_diff if clip.__class__ is YUVOverlayClip else 0,
+                    'max_diff_uv': chroma_diff if clip.__class__ is YUVOverlayClip else 0,
+                })
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _synthetic_photo(megapixels=12, orientation=6):
+    """JPEG bytes of a 4:3 phone photo stored sideways with an EXIF orientation tag"""
+    from PIL import Image
+    from utils.media_ingest import EXIF_ORIENTATION
+
+    height = int((megapixels * 1e6 * 3 / 4) ** 0.5)
+    width = height * 4 // 3
+    gradient = np.linspace(0, 255, width, dtype='float32')
+    pixels = np.empty((height, width, 3), dtype='uint8')
+    pixels[..., 0] = gradient
+    pixels[..., 1] = gradient[::-1]
+    pixels[..., 2] = np.linspace(0, 255, height, dtype='float32')[:, None]
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=90, exif=exif)
+    return buffer.getvalue()
+
+
+def _ingest_previous(data, width, height):
+    """Previous image ingest: temp file, full-resolution decode, convert, stretch"""
+    from PIL import Image
+
+    path = os.path.join(tempfile.gettempdir(), f"bench_{uuid.uuid4().hex[:8]}.jpg")
+    with open(path, 'wb') as f:
+        f.write(data)
+    try:
+        with Image.open(path) as image:
+            return np.asarray(image.convert('RGB').resize((width, height), Image.LANCZOS))
+    finally:
+        os.remove(path)
+
+
+def _measure_ingest(strategy, data, width, height):
+    """Runs in a fresh process: (seconds, peak RSS growth in bytes, output shape)"""
+    from utils.media_ingest import decode_image
+
+    decode = decode_image if strategy == 'draft' else _ingest_previous
+    baseline = _reset_peak_rss()
+    started = time.perf_counter()
+    frame = decode(data, width, height)
+    elapsed = time.perf_counter() - started
+    return elapsed, _peak_rss() - baseline, frame.shape
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _reset_peak_rss():
+    """Reset the peak to the current RSS where Linux allows it; returns the starting point"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+    return _peak_rss()
+
+
+def benchmark_ingest(megapixels=12, width=1080, height=1920):
+    """Time and peak memory of turning one EXIF-rotated phone photo into a timeline frame"""
+    if resource is None:
+        raise RuntimeError('the ingest benchmark needs the resource module (Unix)')
+    data = _synthetic_photo(megapixels)
+    results = []
+    for name, strategy in (('temp file + full decode', 'previous'), ('buffer + draft + EXIF', 'draft')):
+        # Each measurement in its own process so peak RSS starts from the same baseline
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            elapsed, peak, shape = pool.submit(_measure_ingest, strategy, data, width, height).result()
+        results.append({
+            'path': name,
+            'ms': round(elapsed * 1000, 1),
+            'peak_mb': round(peak / 1e6, 1),
+            'output': f"{shape[1]}x{shape[0]}",
+        })
+    return results
+
+
+def benchmark_trim(duration=14.0, gop_seconds=3.0, width=1080, height=1920, fps=30):
+    """Mezzanine of a phone-style H.264 upload: full re-encode vs keyframe-index stream copy"""
+    from utils.keyframe_index import keyframe_index
+    from utils.media_ingest import MediaIngest, MAX_CLIP_SECONDS, MEZZANINE_VIDEO_ARGS
+
+    work_dir = os.path.join(tempfile.gettempdir(), f"bench_{uuid.uuid4().hex[:8]}")
+    os.makedirs(work_dir, exist_ok=True)
+    source_path = os.path.join(work_dir, 'upload.mp4')
+    run_ffmpeg([
+        '-f', 'lavfi', '-i', f"testsrc2=s={width}x{height}:r={fps}:d={duration}",
+        '-f', 'lavfi', '-i', f"sine=f=440:d={duration}",
+        '-c:v', 'libx264', '-profile:v', 'main', '-preset', 'veryfast', '-g', int(fps * gop_seconds),
+        '-sc_threshold', '0', '-c:a', 'aac', '-shortest', source_path
+    ])
+    strategies = [
+        ('re-encode (scale, fps, x264)', lambda out: MediaIngest._reencode_video(source_path, out, width, height, 15)),
+        ('keyframe trim, cold index', lambda out: keyframe_index.trim(source_path, out, MAX_CLIP_SECONDS, MEZZANINE_VIDEO_ARGS)),
+        ('keyframe trim, cached index', lambda out: keyframe_index.trim(source_path, out, MAX_CLIP_SECONDS, MEZZANINE_VIDEO_ARGS)),
+    ]
+    results = []
+    try:
+        for index, (name, produce) in enumerate(strategies):
+            output_path = os.path.join(work_dir, f"mezzanine_{index}.mp4")
+            wall_start, cpu_start = time.perf_counter(), cpu_seconds()
+            report = produce(output_path) or {}
+            results.append({
+                'path': name,
+                'wall_time': round(time.perf_counter() - wall_start, 3),
+                'cpu_seconds': round(cpu_seconds() - cpu_start, 3),
+                're_encoded_seconds': report.get('re_encoded_seconds', min(duration, MAX_CLIP_SECONDS)),
+                'size_kb': round(os.path.getsize(output_path) / 1024, 1),
+            })
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def print_table(results, columns):
+    """Plain-text table of result dicts"""
+    widths = {c: max(len(c), *(len(str(r.get(c, ''))) for r in results)) for c in columns}
+    print('  '.join(c.ljust(widths[c]) for c in columns))
+    for row in results:
+        print('  '.join(str(row.get(c, '')).ljust(widths[c]) for c in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m utils.benchmarks', description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    encoders = commands.add_parser('encoders', help='wall time, CPU seconds and size per encode profile')
+    encoders.add_argument('--duration', type=float, default=6.0)
+    encoders.add_argument('--width', type=int, default=1080)
+    encoders.add_argument('--height', type=int, default=1920)
+    encoders.add_argument('--profiles', help='comma-separated profile names (default: all)')
+
+    blit = commands.add_parser('blit', help='per-frame cost of compositing one karaoke word')
+    blit.add_argument('--frames', type=int, default=200)
+    blit.add_argument('--effect', default='glow')
+
+    yuv = commands.add_parser('yuv', help='text_only frames composited in rgb24 vs directly in yuv420p')
+    yuv.add_argument('--duration', type=float, default=6.0)
+    yuv.add_argument('--width', type=int, default=1080)
+    yuv.add_argument('--height', type=int, default=1920)
+    yuv.add_argument('--profile', default='fast')
+
+    ingest = commands.add_parser('ingest', help='time and peak memory of ingesting a phone photo')
+    ingest.add_argument('--megapixels', type=float, default=12)
+
+    trim = commands.add_parser('trim', help='mezzanine of an H.264 upload: re-encode vs stream-copy trim')
+    trim.add_argument('--duration', type=float, default=14.0)
+    trim.add_argument('--gop', type=float, default=3.0, help='keyframe interval of the upload in seconds')
+
+    args = parser.parse_args(argv)
+    if args.command == 'encoders':
+        profiles = args.profiles.split(',') if args.profiles else None
+        results = benchmark_encoders(args.duration, args.width, args.height, profiles)
+        print_table(results, ['timeline', 'profile', 'wall_time', 'cpu_seconds', 'size_kb', 'error'])
+    elif args.command == 'blit':
+        print_table(benchmark_blit(args.frames, effect=args.effect), ['strategy', 'ms_per_frame', 'speedup', 'max_diff'])
+    elif args.command == 'yuv':
+        results = benchmark_yuv(args.duration, args.width, args.height, args.profile)
+        print_table(results, ['path', 'output', 'wall_time', 'cpu_seconds', 'ms_per_frame', 'composite_ms', 'max_diff_y', 'max_diff_uv'])
+    elif args.command == 'ingest':
+        print_table(benchmark_ingest(args.megapixels), ['path', 'ms', 'peak_mb', 'output'])
+    elif args.command == 'trim':
+        results = benchmark_trim(args.duration, args.gop)
+        print_table(results, ['path', 'wall_time', 'cpu_seconds', 're_encoded_seconds', 'size_kb'])
+
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,14 @@ import os
 import time
 import threading
 import tempfile
+from utils.render_cache import prune_cache
 
 class CleanupManager:
     def __init__(self):
         self.temp_dir = tempfile.gettempdir()
         self.cleanup_interval = 300  # 5 minutes
         self.max_file_age = 3600  # 1 hour
+        self.max_cache_age = 86400  # 24 hours since last use
         self.running = False
         self.cleanup_thread = None
     
@@ -58,6 +60,10 @@ class CleanupManager:
         
         if files_cleaned > 0:
             print(f"✅ Cleaned up {files_cleaned} old files")
+
+        cache_cleaned = prune_cache(self.max_cache_age)
+        if cache_cleaned > 0:
+            print(f"✅ Pruned {cache_cleaned} unused render cache files")
     
     def get_storage_info(self):
         """Get storage usage information"""
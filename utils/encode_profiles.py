@@ -0,0 +1,159 @@
+"""
+Named encode profiles shared by the MoviePy writer and the ffmpeg backends
+"""
+
+# Modes whose frames are mostly static (text on black, still images)
+STILL_MODES = ('text_only', 'slideshow')
+
+ENCODE_PROFILES = {
+    'balanced': {
+        'name': 'Seimbang (default)',
+        'codec': 'libx264',
+        'preset': 'medium',
+        'bitrate': '1500k',
+        'crf': None,
+        'tune': None,
+        'still_tune': 'stillimage',
+        'threads': 4,
+        'keyint_seconds': 2,
+        'extra_params': [],
+    },
+    'fast': {
+        'name': 'Cepat (veryfast, CRF 23)',
+        'codec': 'libx264',
+        'preset': 'veryfast',
+        'bitrate': None,
+        'crf': 23,
+        'tune': None,
+        'still_tune': 'stillimage',
+        'threads': 0,
+        'keyint_seconds': 2,
+        'extra_params': [],
+    },
+    'quality': {
+        'name': 'Kualitas tinggi (slow, CRF 18)',
+        'codec': 'libx264',
+        'preset': 'slow',
+        'bitrate': None,
+        'crf': 18,
+        'tune': None,
+        'still_tune': 'stillimage',
+        'threads': 0,
+        'keyint_seconds': 4,
+        'extra_params': [],
+    },
+    'animation': {
+        'name': 'Animasi/teks (tune animation)',
+        'codec': 'libx264',
+        'preset': 'medium',
+        'bitrate': None,
+        'crf': 22,
+        'tune': 'animation',
+        'still_tune': 'animation',
+        'threads': 0,
+        'keyint_seconds': 4,
+        'extra_params': [],
+    },
+    'hevc': {
+        'name': 'HEVC/H.265 (file lebih kecil)',
+        'codec': 'libx265',
+        'preset': 'fast',
+        'bitrate': None,
+        'crf': 26,
+        'tune': None,
+        'still_tune': None,
+        'threads': 0,
+        'keyint_seconds': 2,
+        'extra_params': ['-tag:v', 'hvc1'],
+    },
+    'vp9': {
+        'name': 'VP9 (libvpx-vp9)',
+        'codec': 'libvpx-vp9',
+        'preset': None,
+        'bitrate': '0',
+        'crf': 32,
+        'tune': None,
+        'still_tune': None,
+        'threads': 0,
+        'keyint_seconds': 2,
+        'extra_params': ['-row-mt', '1', '-deadline', 'good', '-cpu-used', '4'],
+    },
+    'draft': {
+        'name': 'Draft (ultrafast, pratinjau)',
+        'codec': 'libx264',
+        'preset': 'ultrafast',
+        'bitrate': None,
+        'crf': 30,
+        'tune': None,
+        'still_tune': None,
+        'threads': 0,
+        'keyint_seconds': 2,
+        'extra_params': [],
+    },
+}
+
+DEFAULT_ENCODE_PROFILE = 'balanced'
+
+# Frame area the profile bitrates are tuned for (1080x1920)
+REFERENCE_FRAME_AREA = 1080 * 1920
+
+
+def get_encode_profile(profile_name):
+    """Profile config by name (or a profile dict, e.g. from utils.size_target), falling back to the default"""
+    if isinstance(profile_name, dict):
+        return profile_name
+    return ENCODE_PROFILES.get(profile_name, ENCODE_PROFILES[DEFAULT_ENCODE_PROFILE])
+
+
+def _rate_control_params(profile, fps, mode):
+    """Codec options beyond codec/bitrate/preset: CRF, tune, keyframe interval, extras"""
+    params = []
+    if profile['crf'] is not None:
+        params += ['-crf', str(profile['crf'])]
+    # Capped CRF: the VBV ceiling keeps the quality-driven rate under a size budget
+    if profile.get('maxrate'):
+        params += ['-maxrate', profile['maxrate'], '-bufsize', profile['bufsize']]
+    tune = profile['still_tune'] if mode in STILL_MODES else profile['tune']
+    if tune:
+        params += ['-tune', tune]
+    if profile['keyint_seconds']:
+        params += ['-g', str(int(round(fps * profile['keyint_seconds'])))]
+    return params + list(profile['extra_params'])
+
+
+def moviepy_write_kwargs(profile_name, fps, mode='video'):
+    """Keyword arguments for Clip.write_videofile under a profile"""
+    profile = get_encode_profile(profile_name)
+    kwargs = {
+        'codec': profile['codec'],
+        'bitrate': profile['bitrate'],
+        'threads': profile['threads'] or None,
+        'ffmpeg_params': _rate_control_params(profile, fps, mode) + ['-pix_fmt', 'yuv420p'],
+    }
+    if profile['preset']:
+        kwargs['preset'] = profile['preset']
+    return kwargs
+
+
+def scaled_bitrate(bitrate, frame_size):
+    """Profile bitrate ('1500k') scaled to a frame size's share of REFERENCE_FRAME_AREA"""
+    if not bitrate.endswith('k'):
+        return bitrate
+    width, height = frame_size
+    return f"{max(200, int(int(bitrate[:-1]) * width * height / REFERENCE_FRAME_AREA))}k"
+
+
+def ffmpeg_video_args(profile_name, fps, mode='video', frame_size=None):
+    """Output video arguments for an ffmpeg command line under a profile
+
+    frame_size scales a fixed bitrate for renditions smaller than 1080x1920.
+    """
+    profile = get_encode_profile(profile_name)
+    args = ['-c:v', profile['codec']]
+    if profile['preset']:
+        args += ['-preset', profile['preset']]
+    if profile['bitrate']:
+        args += ['-b:v', scaled_bitrate(profile['bitrate'], frame_size) if frame_size else profile['bitrate']]
+    if profile['threads']:
+        args += ['-threads', str(profile['threads'])]
+    return args + _rate_control_params(profile, fps, mode) + ['-pix_fmt', 'yuv420p']
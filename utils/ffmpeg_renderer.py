@@ -0,0 +1,362 @@
+"""
+FFmpeg render backend: builds one filtergraph per job so no frame passes through Python
+"""
+import os
+import subprocess
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def run_ffmpeg(args, timeout=None):
+    """Run ffmpeg with the given arguments, raising RuntimeError with stderr on failure"""
+    cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y'] + [str(a) for a in args]
+    logger.info("Running: %s", ' '.join(cmd))
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+    return result
+
+
+def filter_path(path):
+    """Escape a file path for use as a filter option value"""
+    path = path.replace('\\', '/')
+    return "'" + path.replace(':', '\\:').replace("'", "\\'") + "'"
+
+
+def concat_path(path):
+    """Quote a file path for an ffconcat script"""
+    return "'" + path.replace('\\', '/').replace("'", "'\\''") + "'"
+
+
+def overlay_filter(top):
+    """Lay a full-width band with alpha over the frame at row top, keeping yuv420p output"""
+    return f"overlay=0:{top}:eof_action=pass:format=auto,format=yuv420p"
+
+
+class FFmpegRenderer:
+    def __init__(self):
+        self.video_codec_args = ['-c:v', 'libx264', '-b:v', '1500k', '-threads', '4', '-pix_fmt', 'yuv420p']
+        self.audio_codec_args = ['-c:a', 'aac']
+
+    def build_timeline(self, media, duration):
+        """Repeat media entries (path, is_image, clip_duration) in order until they cover duration"""
+        timeline = []
+        covered = 0.0
+        while media and covered < duration:
+            for entry in media:
+                if covered >= duration:
+                    break
+                timeline.append(entry)
+                covered += entry[2]
+        return timeline
+
+    def render(self, output_path, width, height, fps, duration, media=None,
+               audio_path=None, background_music=None, music_volume=0.3,
+               subtitle_path=None, fonts_dir=None, video_args=None, audio_copy=False, overlay=None):
+        """Render media (or a black background when media is empty) with burned-in ASS subtitles
+
+        video_args overrides the default codec arguments (see utils.encode_profiles).
+        audio_copy: audio_path is used unchanged (no music, long enough) and is stream-copied.
+        overlay: utils.subtitle_overlay.SubtitleOverlay laid over the frames in the same graph.
+        """
+        inputs = []
+        filters = self._background_filters(inputs, media, [(width, height)], fps, duration)
+
+        video_label = '[base0]'
+        if subtitle_path:
+            filters.append(f"[base0]{self._subtitle_filter(subtitle_path, fonts_dir)}[vout]")
+            video_label = '[vout]'
+        video_label = self._overlay_filters(inputs, filters, video_label, overlay)
+
+        if audio_copy and audio_path and not background_music:
+            audio_label, audio_args = f"{self._input_count(inputs)}:a:0", ['-c:a', 'copy']
+            inputs += ['-i', audio_path]
+        else:
+            audio_filters, audio_label = self._audio_filters(
+                inputs, duration, audio_path, background_music, music_volume
+            )
+            filters += audio_filters
+            audio_args = self.audio_codec_args
+
+        args = inputs + ['-filter_complex', ';'.join(filters), '-map', video_label]
+        if audio_label:
+            args += ['-map', audio_label] + audio_args
+        args += (video_args or self.video_codec_args) + ['-r', fps, '-t', f"{duration:.3f}", '-movflags', '+faststart', output_path]
+
+        run_ffmpeg(args)
+        return output_path
+
+    def write_concat_list(self, entries, list_path):
+        """ffconcat script playing each (path, seconds) entry in order"""
+        lines = ['ffconcat version 1.0']
+        for path, seconds in entries:
+            lines += [f"file {concat_path(path)}", f"duration {seconds:.3f}"]
+        # The demuxer ignores the duration of the final entry; listing the file again keeps it
+        if entries:
+            lines.append(f"file {concat_path(entries[-1][0])}")
+        with open(list_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return list_path
+
+    def render_slideshow(self, output_path, images, width, height, fps, duration,
+                         audio_path=None, background_music=None, music_volume=0.3,
+                         subtitle_path=None, fonts_dir=None, video_args=None, overlay=None):
+        """Render still images (path, seconds) through the concat demuxer
+
+        Each image is decoded and scaled/padded once; the fps filter then repeats it
+        into constant-frame-rate output. The sequence repeats until it covers duration.
+        overlay: utils.subtitle_overlay.SubtitleOverlay laid over the frames in the same graph.
+        """
+        timeline = self.build_timeline([(path, True, seconds) for path, seconds in images], duration)
+        if not timeline:
+            raise ValueError("Slideshow needs at least one image")
+        entries = [(path, seconds) for path, _, seconds in timeline]
+        # Last entry ends exactly at duration
+        covered = sum(seconds for _, seconds in entries[:-1])
+        entries[-1] = (entries[-1][0], max(duration - covered, 1.0 / fps))
+
+        list_path = f"{output_path}.ffconcat"
+        self.write_concat_list(entries, list_path)
+        try:
+            inputs = ['-f', 'concat', '-safe', '0', '-i', list_path]
+            filters = [
+                f"[0:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},format=yuv420p[base]"
+            ]
+            video_label = '[base]'
+            if subtitle_path:
+                filters.append(f"[base]{self._subtitle_filter(subtitle_path, fonts_dir)}[vout]")
+                video_label = '[vout]'
+            video_label = self._overlay_filters(inputs, filters, video_label, overlay)
+            audio_filters, audio_label = self._audio_filters(inputs, duration, audio_path, background_music, music_volume)
+            filters += audio_filters
+
+            args = inputs + ['-filter_complex', ';'.join(filters), '-map', video_label]
+            if audio_label:
+                args += ['-map', audio_label] + self.audio_codec_args
+            args += (video_args or self.video_codec_args) + ['-t', f"{duration:.3f}", '-movflags', '+faststart', output_path]
+            run_ffmpeg(args)
+        finally:
+            if os.path.exists(list_path):
+                os.remove(list_path)
+        return output_path
+
+    def mux_soft_subtitles(self, source_path, subtitle_path, output_path, duration,
+                           copy_video=True, audio_path=None, background_music=None,
+                           music_volume=0.3, language='und', source_has_audio=True,
+                           video_args=None, audio_copy=False):
+        """Mux a subtitle file as a mov_text track, stream-copying the video when possible
+
+        audio_copy: audio_path is used unchanged (no music, long enough) and is stream-copied.
+        """
+        inputs = ['-i', source_path, '-i', subtitle_path]
+        filters = []
+        audio_map = None
+        copy_audio = False
+
+        # Narration replaces the source soundtrack; otherwise keep the original audio
+        if audio_path and os.path.exists(audio_path):
+            index = self._input_count(inputs)
+            if audio_copy and not background_music:
+                inputs += ['-i', audio_path]
+                audio_map = f"{index}:a:0"
+                copy_audio = True
+            else:
+                inputs += ['-stream_loop', '-1', '-i', audio_path]
+                audio_map = f"{index}:a"
+        elif source_has_audio:
+            audio_map = '0:a'
+            copy_audio = True
+
+        if background_music and os.path.exists(background_music):
+            index = self._input_count(inputs)
+            inputs += ['-stream_loop', '-1', '-i', background_music]
+            music = f"[{index}:a]volume={music_volume},atrim=0:{duration:.3f},asetpts=PTS-STARTPTS"
+            if audio_map:
+                filters.append(f"[{audio_map}]atrim=0:{duration:.3f},asetpts=PTS-STARTPTS[voice]")
+                filters.append(f"{music}[music]")
+                filters.append("[voice][music]amix=inputs=2:duration=first:normalize=0[aout]")
+            else:
+                filters.append(f"{music}[aout]")
+            audio_map = '[aout]'
+            copy_audio = False
+
+        args = list(inputs)
+        if filters:
+            args += ['-filter_complex', ';'.join(filters)]
+        args += ['-map', '0:v:0', '-map', '1:s:0']
+        if audio_map:
+            args += ['-map', audio_map]
+            args += ['-c:a', 'copy'] if copy_audio else self.audio_codec_args
+        args += ['-c:v', 'copy'] if copy_video else (video_args or self.video_codec_args)
+        args += ['-c:s', 'mov_text', '-metadata:s:s:0', f"language={language}",
+                 '-t', f"{duration:.3f}", '-movflags', '+faststart', output_path]
+
+        run_ffmpeg(args)
+        return output_path
+
+    def render_variants(self, branches, width, height, fps, duration, media=None, video_args=None,
+                        background_music=None, music_volume=0.3):
+        """Decode and scale the media once and split the frames into one output per branch
+
+        branches: (output_path, duration, overlay, audio_path); overlay is None or a
+        utils.subtitle_overlay.SubtitleOverlay laid over that branch only. Each branch
+        mixes its own narration with the background music. duration covers the longest branch.
+        """
+        inputs = []
+        filters = self._background_filters(inputs, media, [(width, height)], fps, duration)
+        labels = ''.join(f"[bg{i}]" for i in range(len(branches)))
+        filters.append(f"[base0]split={len(branches)}{labels}")
+        outputs = []
+        for i, (output_path, branch_duration, overlay, audio_path) in enumerate(branches):
+            if overlay:
+                index = self._input_count(inputs)
+                inputs += overlay.input_args
+                filters.append(f"[bg{i}][{index}:v]{overlay_filter(overlay.top)}[v{i}]")
+            else:
+                filters.append(f"[bg{i}]null[v{i}]")
+            audio_filters, audio_label = self._audio_filters(
+                inputs, branch_duration, audio_path, background_music, music_volume, suffix=str(i)
+            )
+            filters += audio_filters
+            outputs += ['-map', f"[v{i}]"]
+            if audio_label:
+                outputs += ['-map', audio_label] + self.audio_codec_args
+            outputs += (video_args or self.video_codec_args) + [
+                '-r', fps, '-t', f"{branch_duration:.3f}", '-movflags', '+faststart', output_path
+            ]
+
+        run_ffmpeg(inputs + ['-filter_complex', ';'.join(filters)] + outputs)
+        return [branch[0] for branch in branches]
+
+    def encode_audio(self, output_path, duration, audio_path=None, background_music=None, music_volume=0.3):
+        """Mix narration and music once into an AAC file; None when there is no audio"""
+        inputs = []
+        filters, audio_label = self._audio_filters(inputs, duration, audio_path, background_music, music_volume)
+        if not audio_label:
+            return None
+        run_ffmpeg(inputs + ['-filter_complex', ';'.join(filters), '-map', audio_label]
+                   + self.audio_codec_args + ['-t', f"{duration:.3f}", '-vn', output_path])
+        return output_path
+
+    def render_renditions(self, renditions, fps, duration, media=None, audio_path=None):
+        """Decode each source once and encode it at several sizes with per-rendition overlays
+
+        renditions: (output_path, width, height, overlay, video_args); overlay is None or
+        a utils.subtitle_overlay.SubtitleOverlay laid out for that size. audio_path holds
+        encoded audio (see encode_audio) and is stream-copied into every output.
+        """
+        inputs = []
+        filters = self._background_filters(inputs, media, [(w, h) for _, w, h, _, _ in renditions], fps, duration)
+        audio_index = None
+        if audio_path:
+            audio_index = self._input_count(inputs)
+            inputs += ['-i', audio_path]
+        outputs = []
+        for k, (output_path, _, _, overlay, video_args) in enumerate(renditions):
+            if overlay:
+                index = self._input_count(inputs)
+                inputs += overlay.input_args
+                filters.append(f"[base{k}][{index}:v]{overlay_filter(overlay.top)}[v{k}]")
+            else:
+                filters.append(f"[base{k}]null[v{k}]")
+            outputs += ['-map', f"[v{k}]"]
+            if audio_index is not None:
+                outputs += ['-map', f"{audio_index}:a", '-c:a', 'copy']
+            outputs += (video_args or self.video_codec_args) + [
+                '-r', fps, '-t', f"{duration:.3f}", '-movflags', '+faststart', output_path
+            ]
+
+        run_ffmpeg(inputs + ['-filter_complex', ';'.join(filters)] + outputs)
+        return [rendition[0] for rendition in renditions]
+
+    def _background_filters(self, inputs, media, sizes, fps, duration):
+        """Add media inputs scaled/padded to each (width, height) of sizes, black when media is empty
+
+        Every input is decoded once and split when several sizes are needed; the
+        background of sizes[k] is the graph output [base{k}].
+        """
+        filters = []
+        timeline = self.build_timeline(media or [], duration)
+        if timeline:
+            labels = [[] for _ in sizes]
+            for path, is_image, clip_duration in timeline:
+                index = self._input_count(inputs)
+                if is_image:
+                    inputs += ['-loop', '1', '-framerate', fps, '-t', f"{clip_duration:.3f}", '-i', path]
+                else:
+                    inputs += ['-t', f"{clip_duration:.3f}", '-i', path]
+                sources = [f"[{index}:v]"]
+                if len(sizes) > 1:
+                    sources = [f"[s{index}_{k}]" for k in range(len(sizes))]
+                    filters.append(f"[{index}:v]split={len(sizes)}{''.join(sources)}")
+                for k, ((width, height), source) in enumerate(zip(sizes, sources)):
+                    filters.append(
+                        f"{source}scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},format=yuv420p,"
+                        f"setpts=PTS-STARTPTS[v{index}_{k}]"
+                    )
+                    labels[k].append(f"[v{index}_{k}]")
+            for k, size_labels in enumerate(labels):
+                filters.append(
+                    f"{''.join(size_labels)}concat=n={len(size_labels)}:v=1:a=0,"
+                    f"trim=duration={duration:.3f},setpts=PTS-STARTPTS[base{k}]"
+                )
+        else:
+            for k, (width, height) in enumerate(sizes):
+                index = self._input_count(inputs)
+                inputs += ['-f', 'lavfi', '-i', f"color=c=black:s={width}x{height}:r={fps}:d={duration:.3f}"]
+                filters.append(f"[{index}:v]format=yuv420p[base{k}]")
+        return filters
+
+    def _audio_filters(self, inputs, duration, audio_path, background_music, music_volume, suffix=''):
+        """Add looped narration/music inputs; returns (filters, output label or None)
+
+        suffix keeps the labels unique when one graph mixes audio for several outputs.
+        """
+        audio_label = None
+        audio_filters = []
+        if audio_path and os.path.exists(audio_path):
+            index = self._input_count(inputs)
+            inputs += ['-stream_loop', '-1', '-i', audio_path]
+            audio_filters.append(f"[{index}:a]atrim=0:{duration:.3f},asetpts=PTS-STARTPTS[narration{suffix}]")
+            audio_label = f"[narration{suffix}]"
+        if background_music and os.path.exists(background_music):
+            index = self._input_count(inputs)
+            inputs += ['-stream_loop', '-1', '-i', background_music]
+            audio_filters.append(
+                f"[{index}:a]volume={music_volume},atrim=0:{duration:.3f},asetpts=PTS-STARTPTS[music{suffix}]"
+            )
+            if audio_label:
+                audio_filters.append(
+                    f"{audio_label}[music{suffix}]amix=inputs=2:duration=first:normalize=0[aout{suffix}]"
+                )
+                audio_label = f"[aout{suffix}]"
+            else:
+                audio_label = f"[music{suffix}]"
+        return audio_filters, audio_label
+
+    def _overlay_filters(self, inputs, filters, video_label, overlay):
+        """Add the overlay input laid over video_label; returns the label of the result"""
+        if not overlay:
+            return video_label
+        index = self._input_count(inputs)
+        inputs += overlay.input_args
+        filters.append(f"{video_label}[{index}:v]{overlay_filter(overlay.top)}[vtext]")
+        return '[vtext]'
+
+    @staticmethod
+    def _subtitle_filter(subtitle_path, fonts_dir=None):
+        ass_filter = f"ass=filename={filter_path(subtitle_path)}"
+        if fonts_dir:
+            ass_filter += f":fontsdir={filter_path(fonts_dir)}"
+        return ass_filter
+
+    @staticmethod
+    def _input_count(inputs):
+        return inputs.count('-i')
+
+
+# Singleton instance
+ffmpeg_renderer = FFmpegRenderer()
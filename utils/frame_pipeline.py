@@ -0,0 +1,383 @@
+"""
+Three-stage frame pipeline: decode, composite and encode run in separate threads
+connected by bounded queues, with rawvideo piped straight into ffmpeg's stdin
+"""
+import time
+import queue
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+import logging
+
+import numpy as np
+
+from utils.ffmpeg_renderer import overlay_filter
+
+logger = logging.getLogger(__name__)
+
+# Frames buffered between two stages; caps pipeline memory at ~2 * QUEUE_SIZE frames
+QUEUE_SIZE = 8
+# How often blocked stages re-check for an abort
+POLL_SECONDS = 0.1
+# How often the progress hook runs while the stages work
+PROGRESS_SECONDS = 1.0
+
+_DONE = object()
+
+
+class PipelineAborted(Exception):
+    """Raised inside a stage when another stage failed"""
+
+
+class MonitoredQueue(queue.Queue):
+    """Bounded queue that samples its occupancy after every put"""
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.samples = 0
+        self.total = 0
+        self.peak = 0
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        size = self.qsize()
+        self.samples += 1
+        self.total += size
+        self.peak = max(self.peak, size)
+
+    def report(self):
+        return {
+            'capacity': self.maxsize,
+            'mean_occupancy': round(self.total / self.samples, 2) if self.samples else 0.0,
+            'peak_occupancy': self.peak,
+        }
+
+
+class StageStats:
+    """Frames handled, time spent working, and time blocked on the neighbouring queues"""
+
+    def __init__(self):
+        self.frames = 0
+        self.busy = 0.0
+        self.wait_input = 0.0
+        self.wait_output = 0.0
+
+    def report(self):
+        return {
+            'frames': self.frames,
+            'busy_time': round(self.busy, 3),
+            'throughput_fps': round(self.frames / self.busy, 1) if self.busy > 0 else None,
+            'wait_input': round(self.wait_input, 3),
+            'wait_output': round(self.wait_output, 3),
+        }
+
+
+class FramePool:
+    """Frame-size uint8 buffers allocated on first use and recycled between pipeline stages"""
+
+    def __init__(self, shape, capacity):
+        self.shape = shape
+        self.capacity = capacity
+        self.free = queue.Queue()
+        self.allocated = 0
+        self.acquired = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """A free buffer; blocks (up to timeout) once all capacity buffers are in flight"""
+        with self.lock:
+            self.acquired += 1
+            if self.free.empty() and self.allocated < self.capacity:
+                self.allocated += 1
+                return np.empty(self.shape, dtype='uint8')
+        return self.free.get(timeout=timeout)
+
+    def release(self, buffer):
+        self.free.put(buffer)
+
+    def report(self):
+        return {
+            'buffers': self.allocated,
+            'buffer_bytes': self.allocated * int(np.prod(self.shape)),
+            'reuses': self.acquired - self.allocated,
+        }
+
+
+class AllocationTracker:
+    """tracemalloc view of one render: peak traced memory and blocks that stay alive mid-render"""
+
+    def __init__(self):
+        self.owns_tracing = False
+        self.baseline = None
+        self.sample = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.owns_tracing = True
+        tracemalloc.reset_peak()
+        self.baseline = tracemalloc.take_snapshot()
+
+    def take_sample(self):
+        """Snapshot while frames are in flight (called once, from a pipeline stage)"""
+        self.sample = tracemalloc.take_snapshot()
+
+    def stop(self):
+        _, peak = tracemalloc.get_traced_memory()
+        if self.owns_tracing:
+            tracemalloc.stop()
+        report = {'peak_bytes': peak, 'new_blocks': 0, 'new_bytes': 0, 'top_sites': []}
+        if self.sample is not None:
+            growth = [d for d in self.sample.compare_to(self.baseline, 'lineno') if d.size_diff > 0]
+            report['new_blocks'] = sum(max(d.count_diff, 0) for d in growth)
+            report['new_bytes'] = sum(d.size_diff for d in growth)
+            report['top_sites'] = [
+                f"{d.traceback[0].filename.rsplit('/', 1)[-1]}:{d.traceback[0].lineno} "
+                f"({d.count_diff:+d} blocks, {d.size_diff / 1e6:+.1f} MB)"
+                for d in growth[:3]
+            ]
+        return report
+
+
+def split_stages(clip):
+    """(source clip, compositor); karaoke overlays are drawn in the compositor stage
+
+    The compositor maps (base frame, t, pooled buffer) to a list of row blocks
+    that together form the output frame, so untouched rows are never copied.
+    Clips that composite in another pixel format provide pipeline_stages().
+    """
+    if hasattr(clip, 'pipeline_stages'):
+        return clip.pipeline_stages()
+    if hasattr(clip, 'base_clip') and hasattr(clip, 'frame_parts'):
+        return clip.base_clip, clip.frame_parts
+    return clip, None
+
+
+def merge_reports(reports):
+    """Combine pipeline reports of several segments into one"""
+    reports = [r for r in reports if r]
+    if not reports:
+        return {}
+    merged = {'frames': sum(r['frames'] for r in reports), 'wall_time': round(sum(r['wall_time'] for r in reports), 3)}
+    merged['stages'] = {}
+    for name in reports[0]['stages']:
+        stats = StageStats()
+        for r in reports:
+            stage = r['stages'][name]
+            stats.frames += stage['frames']
+            stats.busy += stage['busy_time']
+            stats.wait_input += stage['wait_input']
+            stats.wait_output += stage['wait_output']
+        merged['stages'][name] = stats.report()
+    merged['queues'] = {}
+    for name, first in reports[0]['queues'].items():
+        samples = [r['queues'][name] for r in reports]
+        merged['queues'][name] = {
+            'capacity': first['capacity'],
+            'mean_occupancy': round(sum(q['mean_occupancy'] for q in samples) / len(samples), 2),
+            'peak_occupancy': max(q['peak_occupancy'] for q in samples),
+        }
+    merged['bottleneck'] = max(merged['stages'], key=lambda n: merged['stages'][n]['busy_time'])
+    pools = [r['frame_pool'] for r in reports if r.get('frame_pool')]
+    if pools:
+        merged['frame_pool'] = {
+            'buffers': max(p['buffers'] for p in pools),
+            'buffer_bytes': max(p['buffer_bytes'] for p in pools),
+            'reuses': sum(p['reuses'] for p in pools),
+        }
+    traced = [r['allocations'] for r in reports if r.get('allocations')]
+    if traced:
+        merged['allocations'] = max(traced, key=lambda a: a['peak_bytes'])
+    return merged
+
+
+class FramePipeline:
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+
+    def write(self, clip, output_path, fps, video_args, audio_path=None, first_frame=0, last_frame=None,
+              trace_allocations=False, progress=None, overlay=None):
+        """Encode frames [first_frame, last_frame) of clip (all frames by default); returns a report dict
+
+        audio_path, when given, must hold AAC audio; it is muxed by stream copy.
+        overlay: utils.subtitle_overlay.SubtitleOverlay laid over the frames by the encoding ffmpeg.
+        trace_allocations adds tracemalloc statistics to the report.
+        progress(frames_encoded) is called from the calling thread every PROGRESS_SECONDS.
+        """
+        if last_frame is None:
+            last_frame = int(clip.duration * fps)
+        source, composite = split_stages(clip)
+        width, height = clip.size
+        # Compositors may produce yuv420p planes directly, sparing ffmpeg the rgb24 conversion
+        pix_fmt = getattr(clip, 'pix_fmt', 'rgb24')
+
+        cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+               '-f', 'rawvideo', '-pix_fmt', pix_fmt, '-s', f"{width}x{height}", '-r', str(fps), '-i', '-']
+        # Inputs are seeked to the first frame; seeking from 0 would drop the AAC priming packet
+        seek = ['-ss', f"{first_frame / fps:.6f}"] if first_frame else []
+        maps = ['-map', '0:v']
+        if overlay is not None:
+            cmd += seek + overlay.input_args
+            maps = ['-filter_complex', f"[0:v][1:v]{overlay_filter(overlay.top)}[vtext]", '-map', '[vtext]']
+        if audio_path:
+            maps += ['-map', f"{cmd.count('-i')}:a", '-c:a', 'copy',
+                     '-t', f"{(last_frame - first_frame) / fps:.6f}"]
+            cmd += seek + ['-i', audio_path]
+        cmd += maps + [str(a) for a in video_args] + [output_path]
+        logger.info("Running: %s", ' '.join(cmd))
+
+        decoded = MonitoredQueue(self.queue_size)
+        composited = MonitoredQueue(self.queue_size)
+        stats = {'decode': StageStats(), 'composite': StageStats(), 'encode': StageStats()}
+        stop = threading.Event()
+        errors = []
+        # Text bands are written into recycled buffers: one per queued frame plus one per busy stage
+        pool = FramePool(getattr(clip, 'buffer_shape', (height, width, 3)), self.queue_size + 2) if composite is not None else None
+        tracker = AllocationTracker() if trace_allocations else None
+        sample_frame = (first_frame + last_frame) // 2
+
+        def put(q, item, stage):
+            started = time.perf_counter()
+            while True:
+                if stop.is_set():
+                    raise PipelineAborted()
+                try:
+                    q.put(item, timeout=POLL_SECONDS)
+                    break
+                except queue.Full:
+                    continue
+            stage.wait_output += time.perf_counter() - started
+
+        def get(q, stage):
+            started = time.perf_counter()
+            while True:
+                if stop.is_set():
+                    raise PipelineAborted()
+                try:
+                    item = q.get(timeout=POLL_SECONDS)
+                    break
+                except queue.Empty:
+                    continue
+            stage.wait_input += time.perf_counter() - started
+            return item
+
+        def acquire(stage):
+            started = time.perf_counter()
+            while True:
+                if stop.is_set():
+                    raise PipelineAborted()
+                try:
+                    buffer = pool.acquire(timeout=POLL_SECONDS)
+                    break
+                except queue.Empty:
+                    continue
+            stage.wait_output += time.perf_counter() - started
+            return buffer
+
+        def run_stage(body):
+            try:
+                body()
+            except PipelineAborted:
+                pass
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+        def decode():
+            stage = stats['decode']
+            for index in range(first_frame, last_frame):
+                t = index / fps
+                started = time.perf_counter()
+                frame = source.get_frame(t)
+                stage.busy += time.perf_counter() - started
+                stage.frames += 1
+                put(decoded, (t, frame), stage)
+            put(decoded, _DONE, stage)
+
+        def composite_frames():
+            stage = stats['composite']
+            while True:
+                item = get(decoded, stage)
+                if item is _DONE:
+                    break
+                t, frame = item
+                buffer = acquire(stage) if pool is not None else None
+                started = time.perf_counter()
+                # Only sources that are not rgb24 already get converted (a full copy)
+                if pix_fmt == 'rgb24' and (frame.dtype != np.uint8 or frame.shape[2] != 3):
+                    frame = np.array(frame[..., :3], dtype='uint8')
+                parts = composite(frame, t, buffer) if composite is not None else [frame]
+                stage.busy += time.perf_counter() - started
+                if tracker is not None and first_frame + stage.frames == sample_frame:
+                    tracker.take_sample()
+                stage.frames += 1
+                put(composited, (parts, buffer), stage)
+            put(composited, _DONE, stage)
+
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr)
+
+            def encode():
+                stage = stats['encode']
+                while True:
+                    item = get(composited, stage)
+                    if item is _DONE:
+                        break
+                    parts, buffer = item
+                    started = time.perf_counter()
+                    for part in parts:
+                        process.stdin.write(np.ascontiguousarray(part).data)
+                    if buffer is not None:
+                        pool.release(buffer)
+                    stage.busy += time.perf_counter() - started
+                    stage.frames += 1
+
+            started = time.perf_counter()
+            if tracker is not None:
+                tracker.start()
+            threads = [
+                threading.Thread(target=run_stage, args=(body,), name=f"frame-pipeline-{name}", daemon=True)
+                for name, body in (('decode', decode), ('composite', composite_frames), ('encode', encode))
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(PROGRESS_SECONDS if progress else None)
+                    if progress and thread.is_alive():
+                        progress(stats['encode'].frames)
+
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+            returncode = process.wait()
+            wall_time = time.perf_counter() - started
+            allocations = tracker.stop() if tracker is not None else None
+
+            if returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode('utf-8', 'replace').strip()[-500:]
+                raise RuntimeError(f"ffmpeg failed: {message or returncode}")
+        if errors:
+            raise errors[0]
+
+        stage_reports = {name: s.report() for name, s in stats.items()}
+        report = {
+            'frames': last_frame - first_frame,
+            'wall_time': round(wall_time, 3),
+            'stages': stage_reports,
+            'queues': {'decode→composite': decoded.report(), 'composite→encode': composited.report()},
+            # The stage that spends the most time working sets the pace
+            'bottleneck': max(stage_reports, key=lambda n: stage_reports[n]['busy_time']),
+        }
+        if pool is not None:
+            report['frame_pool'] = pool.report()
+        if allocations is not None:
+            report['allocations'] = allocations
+        return report
+
+
+# Singleton instance
+frame_pipeline = FramePipeline()
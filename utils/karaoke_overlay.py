@@ -0,0 +1,112 @@
+"""
+Karaoke overlay clip: one MoviePy clip that draws only the text segments active at time t
+"""
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+from moviepy.video.VideoClip import VideoClip
+
+
+class SegmentIndex:
+    """Sorted start/end index answering 'which segments are active at t' in O(log n + k)"""
+
+    def __init__(self, segments):
+        # segments: iterable of (start, end, payload)
+        ordered = sorted((s for s in segments if s[1] > s[0]), key=lambda s: s[0])
+        self.starts = [s[0] for s in ordered]
+        self.ends = [s[1] for s in ordered]
+        self.payloads = [s[2] for s in ordered]
+        # Longest segment bounds how far back an active segment can start
+        self.max_span = max((e - s for s, e in zip(self.starts, self.ends)), default=0.0)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def active(self, t):
+        """Payloads of segments with start <= t < end, in start order"""
+        lo = bisect_left(self.starts, t - self.max_span)
+        hi = bisect_right(self.starts, t)
+        return [self.payloads[i] for i in range(lo, hi) if self.ends[i] > t]
+
+
+class KaraokeOverlayClip(VideoClip):
+    """Composites atlas bitmaps over a base clip without one MoviePy layer per word"""
+
+    def __init__(self, base_clip, overlays):
+        """overlays: list of (start, end, TextBitmap, (x, y)); x may be 'center'"""
+        super().__init__(ismask=False, duration=base_clip.duration)
+        self.base_clip = base_clip
+        self.size = base_clip.size
+        self.fps = getattr(base_clip, 'fps', None)
+        self.audio = base_clip.audio
+
+        width, height = self.size
+        placed = []
+        for start, end, bitmap, (x, y) in overlays:
+            if x == 'center':
+                x = (width - bitmap.w) // 2
+            # Place the bitmap's visible box; its transparent margin is never blended
+            left, top = bitmap.box
+            placed.append((start, end, (bitmap, int(x) + left, int(y) + top)))
+        self.index = SegmentIndex(placed)
+        self.make_frame = self._make_frame
+
+        # Two uint16 scratch planes big enough for the largest bitmap, reused by every blend
+        box_h = max((b.premultiplied.shape[0] for _, _, (b, _, _) in placed), default=0)
+        box_w = max((b.premultiplied.shape[1] for _, _, (b, _, _) in placed), default=0)
+        self.scratch = np.empty((2, box_h, box_w, 3), dtype='uint16')
+
+    def _make_frame(self, t):
+        parts = self.frame_parts(self.base_clip.get_frame(t), t)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def frame_parts(self, frame, t, out=None):
+        """Output frame as row blocks: base rows are passed through as views, only the text band is copied
+
+        out: optional preallocated frame-size uint8 buffer that receives the band.
+        """
+        active = self.index.active(t)
+        if not active:
+            return [frame]
+        top = max(0, min(y for _, _, y in active))
+        bottom = min(frame.shape[0], max(y + bitmap.premultiplied.shape[0] for bitmap, _, y in active))
+        if top >= bottom:
+            return [frame]
+        if out is None:
+            band = np.array(frame[top:bottom], dtype='uint8')
+        else:
+            band = out[:bottom - top]
+            np.copyto(band, frame[top:bottom], casting='unsafe')
+        for bitmap, x, y in active:
+            self._blend(band, bitmap, x, y - top)
+        return [part for part in (frame[:top], band, frame[bottom:]) if len(part)]
+
+    def _blend(self, frame, bitmap, x, y):
+        """In-place integer alpha blend of the bitmap's visible box at (x, y), clipped to the frame"""
+        blend_premultiplied(frame, bitmap.premultiplied, bitmap.inverse_alpha, x, y, self.scratch)
+
+
+def blend_premultiplied(frame, premultiplied, inverse_alpha, x, y, scratch):
+    """In-place integer alpha blend of a premultiplied box at (x, y), clipped to the frame
+
+    Works on RGB frames and single planes alike; scratch holds two uint16 arrays
+    at least as large as the box, with the same trailing dimensions.
+    """
+    box_h, box_w = premultiplied.shape[:2]
+    height, width = frame.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + box_w, width), min(y + box_h, height)
+    if x0 >= x1 or y0 >= y1:
+        return
+    region = frame[y0:y1, x0:x1]
+    mixed = scratch[0, :y1 - y0, :x1 - x0]
+    carry = scratch[1, :y1 - y0, :x1 - x0]
+    # uint8 * uint16 -> uint16; dst * (255 - a) + src * a <= 255 * 255
+    np.multiply(region, inverse_alpha[y0 - y:y1 - y, x0 - x:x1 - x], out=mixed)
+    mixed += premultiplied[y0 - y:y1 - y, x0 - x:x1 - x]
+    # Exact round(mixed / 255): (v + (v >> 8)) >> 8 with v = mixed + 128
+    mixed += 128
+    np.right_shift(mixed, 8, out=carry)
+    mixed += carry
+    np.right_shift(mixed, 8, out=mixed)
+    np.copyto(region, mixed, casting='unsafe')
@@ -0,0 +1,178 @@
+"""
+Per-asset keyframe index built from packet data (cached by file content) and trims that
+stream-copy whole GOPs, re-encoding only the partial GOP at the cut
+"""
+import os
+import re
+import json
+import uuid
+import tempfile
+import subprocess
+import bisect
+import logging
+from fractions import Fraction
+
+from utils.render_cache import RenderCache, hash_file
+from utils.ffmpeg_renderer import run_ffmpeg, concat_path
+from utils.media_probe import get_video_stream, get_duration, video_rotation, can_stream_copy
+
+logger = logging.getLogger(__name__)
+
+# Bump when the index format changes so stale entries are not reused
+KEYFRAME_INDEX_VERSION = 2
+# A cut this close to a keyframe is treated as landing on it
+KEYFRAME_TOLERANCE = 0.002
+
+
+class KeyframeIndex:
+    def __init__(self):
+        self.temp_dir = tempfile.gettempdir()
+        self.cache = RenderCache('keyframes')
+
+    def keyframes(self, path, digest=None):
+        """[(seconds from the first keyframe, packet index in decode order, packets with an earlier pts)]
+        of the first video stream's keyframes
+
+        The last two match only for a clean cut point: with open GOPs the B-frames displayed
+        before a keyframe follow it in decode order. digest: content hash of the file when
+        the caller already has one.
+        """
+        key = self.cache.key(digest or hash_file(path), KEYFRAME_INDEX_VERSION)
+        cached = self.cache.get(key, '.json')
+        if cached:
+            with open(cached, 'r', encoding='utf-8') as f:
+                return [tuple(entry) for entry in json.load(f)]
+
+        packets = self._probe_packets(path)
+        ordered = sorted(pts for pts, _ in packets if pts is not None)
+        keyframes = [(pts, index, bisect.bisect_left(ordered, pts))
+                     for index, (pts, key) in enumerate(packets) if key and pts is not None]
+        if keyframes:
+            # Input seeking (-ss) counts from the file's start time, not from pts 0
+            first = keyframes[0][0]
+            keyframes = [(round(pts - first, 6), index, before) for pts, index, before in keyframes]
+
+        def write(out):
+            with open(out, 'w', encoding='utf-8') as f:
+                json.dump(keyframes, f)
+        self.cache.store(key, '.json', write)
+        return keyframes
+
+    def can_copy(self, path, width, height):
+        """True when the upload's video can be stream-copied into a width x height H.264 mezzanine"""
+        stream = get_video_stream(path)
+        if not stream or not can_stream_copy(path):
+            return False
+        if (stream.get('width'), stream.get('height')) != (width, height):
+            return False
+        # Rotated phone footage is stored sideways; decoding would turn it, copying would not
+        if video_rotation(stream) % 360:
+            return False
+        return stream.get('sample_aspect_ratio', '1:1') in ('1:1', '0:1', 'N/A')
+
+    def trim(self, source_path, output_path, end, video_args, digest=None):
+        """Write the first end seconds of source_path: whole GOPs copied, the last partial GOP re-encoded
+
+        video_args encode the partial GOP; its parameter sets are repeated in-band so
+        the copied and re-encoded packets can share one MP4 track. Returns a report dict.
+        """
+        keyframes = self.keyframes(source_path, digest)
+        if not keyframes or keyframes[0][1] != 0:
+            raise ValueError("Video does not start with a keyframe")
+        duration = get_duration(source_path)
+        end = min(end, duration)
+
+        if end >= duration - KEYFRAME_TOLERANCE:
+            # Nothing to cut: the whole stream is copied
+            cut_packet, tail = None, 0.0
+        else:
+            # Last clean keyframe at or before the cut; everything before it is copied untouched.
+            # Open-GOP keyframes are skipped: their leading B-frames would be cut off
+            cut_pts, cut_packet, _ = max((k for k in keyframes if k[0] <= end + KEYFRAME_TOLERANCE and k[1] == k[2]),
+                                         key=lambda k: k[0])
+            tail = end - cut_pts if end - cut_pts > KEYFRAME_TOLERANCE else 0.0
+            if cut_packet == 0:
+                raise ValueError("Cut lands inside the first GOP (or the stream has open GOPs)")
+
+        prefix = os.path.join(self.temp_dir, f"trim_{uuid.uuid4().hex[:8]}")
+        pieces = [f"{prefix}_copy.mp4"]
+        try:
+            copy_args = ['-frames:v', cut_packet] if cut_packet else []
+            # Clean cut point: the packets before it in decode order are exactly the frames before it
+            run_ffmpeg(['-i', source_path, '-map', '0:v:0', '-c', 'copy'] + copy_args
+                       + ['-avoid_negative_ts', 'make_zero', pieces[-1]])
+            if tail:
+                pieces.append(f"{prefix}_tail.mp4")
+                run_ffmpeg(['-ss', f"{cut_pts:.6f}", '-i', source_path, '-map', '0:v:0', '-t', f"{tail:.6f}"]
+                           + list(video_args) + ['-x264-params', 'repeat-headers=1', '-fps_mode', 'passthrough',
+                                                 pieces[-1]])
+
+            list_path = f"{prefix}.ffconcat"
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write('ffconcat version 1.0\n' + ''.join(f"file {concat_path(p)}\n" for p in pieces))
+            pieces.append(list_path)
+            run_ffmpeg([
+                '-f', 'concat', '-safe', '0', '-i', list_path, '-t', f"{end:.6f}", '-i', source_path,
+                '-map', '0:v:0', '-map', '1:a:0?', '-c:v', 'copy', '-c:a', 'aac', '-b:a', '128k',
+                '-t', f"{end:.6f}", '-movflags', '+faststart', '-f', 'mp4', output_path
+            ])
+        finally:
+            for piece in pieces:
+                if os.path.exists(piece):
+                    os.remove(piece)
+
+        return {
+            'copied_seconds': round(end - tail, 3),
+            're_encoded_seconds': round(tail, 3),
+            'keyframes': len(keyframes),
+        }
+
+    @staticmethod
+    def _probe_packets(path):
+        """[(pts in seconds or None, is keyframe)] of the first video stream's packets in decode order,
+        from ffprobe, or from ffmpeg's framecrc output when ffprobe is missing"""
+        try:
+            result = subprocess.run(
+                ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags',
+                 '-of', 'csv=p=0', path],
+                capture_output=True, text=True, timeout=120
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"ffprobe failed for {path}: {result.stderr.strip()[-300:]}")
+            packets = []
+            for line in result.stdout.splitlines():
+                pts_time, _, flags = line.partition(',')
+                packets.append((float(pts_time) if pts_time not in ('', 'N/A') else None, 'K' in flags))
+            return packets
+        except FileNotFoundError:
+            logger.info(f"ffprobe unavailable for {path}, reading packets with ffmpeg framecrc")
+            return KeyframeIndex._framecrc_packets(path)
+
+    @staticmethod
+    def _framecrc_packets(path):
+        # framecrc lines: stream, dts, pts, duration, size, hash[, F=flags]; key packets carry no F= or bit 0x1
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', path, '-map', '0:v:0', '-c', 'copy',
+             '-f', 'framecrc', '-'],
+            capture_output=True, text=True, timeout=120
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg packet scan failed for {path}: {result.stderr.strip()[-300:]}")
+        time_base = Fraction(1)
+        packets = []
+        for line in result.stdout.splitlines():
+            match = re.match(r"#tb 0: (\d+)/(\d+)", line)
+            if match:
+                time_base = Fraction(int(match.group(1)), int(match.group(2)))
+                continue
+            if line.startswith('#'):
+                continue
+            fields = [field.strip() for field in line.split(',')]
+            flags = next((f[2:] for f in fields[6:] if f.startswith('F=')), None)
+            pts = float(int(fields[2]) * time_base) if fields[2] != 'N/A' else None
+            packets.append((pts, flags is None or bool(int(flags, 16) & 1)))
+        return packets
+
+
+# Singleton instance
+keyframe_index = KeyframeIndex()
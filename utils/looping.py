@@ -0,0 +1,48 @@
+"""
+Constant-memory looping: map t -> t mod source_duration instead of concatenating copies
+"""
+import numpy as np
+from moviepy.audio.AudioClip import AudioClip
+
+
+def loop_clip(clip, target_duration):
+    """Loop a video clip (and its mask/audio) to target_duration with a single time mapping"""
+    period = clip.duration
+    looped = clip.fl_time(lambda t: t % period, apply_to=['mask'], keep_duration=False)
+    looped = looped.set_duration(target_duration)
+    if clip.audio is not None:
+        looped = looped.set_audio(loop_audio(clip.audio, target_duration))
+    return looped
+
+
+def loop_audio(audio_clip, target_duration, crossfade=0.0):
+    """Loop an audio clip to target_duration, optionally crossfading crossfade seconds at each seam"""
+    period = audio_clip.duration
+    crossfade = min(max(0.0, crossfade), period / 2)
+    step = period - crossfade
+
+    def make_frame(t):
+        scalar = np.ndim(t) == 0
+        t = np.atleast_1d(np.asarray(t, dtype='float64'))
+        local = np.mod(t, step)
+        frame = _read_monotonic(audio_clip, local)
+        if crossfade > 0:
+            # Inside a seam the next loop's head fades in over the previous loop's tail
+            in_seam = (t >= step) & (local < crossfade)
+            if np.any(in_seam):
+                tail = _read_monotonic(audio_clip, local[in_seam] + step)
+                weight = (local[in_seam] / crossfade).reshape(-1, *([1] * (frame.ndim - 1)))
+                frame[in_seam] = frame[in_seam] * weight + tail * (1.0 - weight)
+        return frame[0] if scalar else frame
+
+    # Composite audio (e.g. concatenated clips) carries no fps of its own
+    return AudioClip(make_frame, duration=target_duration, fps=getattr(audio_clip, 'fps', None) or 44100)
+
+
+def _read_monotonic(audio_clip, times):
+    """get_frame for a time array that may wrap around; readers only handle increasing chunks"""
+    wraps = np.flatnonzero(np.diff(times) < 0) + 1
+    if len(wraps) == 0:
+        return np.array(audio_clip.get_frame(times), dtype='float64')
+    pieces = np.split(times, wraps)
+    return np.concatenate([np.array(audio_clip.get_frame(p), dtype='float64') for p in pieces if len(p)])
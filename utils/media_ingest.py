@@ -0,0 +1,157 @@
+"""
+Upload ingest: normalize each asset once into a mezzanine at the target size and fps
+(H.264 videos already at the target size keep their frames and frame rate)
+"""
+import io
+import os
+import uuid
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+
+import numpy as np
+from PIL import Image
+
+from utils.render_cache import RenderCache, hash_bytes
+from utils.ffmpeg_renderer import run_ffmpeg
+from utils.keyframe_index import keyframe_index
+
+logger = logging.getLogger(__name__)
+
+# The standard timeline only ever uses the first 10 seconds of a video upload
+MAX_CLIP_SECONDS = 10
+# Bump when the mezzanine encoding changes so stale entries are not reused
+MEZZANINE_VERSION = 2
+MEZZANINE_VIDEO_ARGS = ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18', '-pix_fmt', 'yuv420p']
+
+# EXIF orientations 5-8 store the image rotated by 90 degrees
+EXIF_ORIENTATION = 0x0112
+_EXIF_TRANSPOSE = {
+    2: Image.FLIP_LEFT_RIGHT, 3: Image.ROTATE_180, 4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE, 6: Image.ROTATE_270, 7: Image.TRANSVERSE, 8: Image.ROTATE_90,
+}
+
+
+def decode_image(data, width=None, height=None):
+    """RGB uint8 array of encoded image bytes, upright per EXIF and resized to (width, height)
+
+    A missing width or height follows the upright aspect ratio. JPEGs are decoded
+    with DCT scaling (draft) to the smallest size still covering the target, and
+    the image is resized before it is rotated, so no full-resolution RGB copy of
+    a large photo is ever made.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        transpose = _EXIF_TRANSPOSE.get(image.getexif().get(EXIF_ORIENTATION))
+        rotated = transpose in (Image.TRANSPOSE, Image.ROTATE_270, Image.TRANSVERSE, Image.ROTATE_90)
+        stored_w, stored_h = image.size
+        upright_w, upright_h = (stored_h, stored_w) if rotated else (stored_w, stored_h)
+        width = width or max(1, round(upright_w * height / upright_h))
+        height = height or max(1, round(upright_h * width / upright_w))
+
+        # Target size in the stored (not yet rotated) orientation
+        size = (height, width) if rotated else (width, height)
+        if image.format == 'JPEG':
+            image.draft('RGB', size)
+        source = image if image.mode == 'RGB' else image.convert('RGB')
+        resized = source.resize(size, Image.LANCZOS, reducing_gap=3.0)
+    if transpose is not None:
+        resized = resized.transpose(transpose)
+    return np.asarray(resized)
+
+
+class MediaIngest:
+    def __init__(self, max_workers=None):
+        self.temp_dir = tempfile.gettempdir()
+        self.cache = RenderCache('media')
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or min(4, os.cpu_count() or 1),
+            thread_name_prefix='media-ingest'
+        )
+        self.pending = {}
+        self.lock = threading.RLock()
+
+    def cache_key(self, data, is_image, width, height, fps):
+        """sha256 of the bytes plus everything that defines the target format"""
+        kind = 'image' if is_image else f"video-{MAX_CLIP_SECONDS}s"
+        return self.cache.key(hash_bytes(data), kind, width, height, fps, MEZZANINE_VERSION)
+
+    def submit(self, media_file, width, height, fps):
+        """Start normalizing an upload; returns (future, state) with state 'ready', 'pending' or 'queued'"""
+        data = media_file.getvalue()
+        is_image = not media_file.type.startswith('video')
+        key = self.cache_key(data, is_image, width, height, fps)
+        ext = '.png' if is_image else '.mp4'
+
+        with self.lock:
+            cached = self.cache.get(key, ext)
+            if cached:
+                future = Future()
+                future.set_result(cached)
+                return future, 'ready'
+            if key in self.pending:
+                return self.pending[key], 'pending'
+
+            future = self.executor.submit(self._normalize, key, ext, data, media_file.name, is_image, width, height, fps)
+            self.pending[key] = future
+            future.add_done_callback(lambda _: self._forget(key))
+            return future, 'queued'
+
+    def prefetch(self, media_files, width, height, fps):
+        """Queue every upload for normalization (called from the upload tab)"""
+        for media_file in media_files:
+            try:
+                self.submit(media_file, width, height, fps)
+            except Exception as e:
+                logger.warning(f"Could not queue {media_file.name} for ingest: {e}")
+
+    def normalized_path(self, media_file, width, height, fps):
+        """Mezzanine path for an upload, waiting for (or doing) the normalization; returns (path, state)"""
+        future, state = self.submit(media_file, width, height, fps)
+        return future.result(), state
+
+    def _forget(self, key):
+        with self.lock:
+            self.pending.pop(key, None)
+
+    def _normalize(self, key, ext, data, name, is_image, width, height, fps):
+        if is_image:
+            # Decoded straight from the upload bytes, no temp file
+            return self.cache.store(key, ext, lambda out: self._normalize_image(data, out, width, height))
+        source_path = os.path.join(self.temp_dir, f"ingest_{uuid.uuid4().hex[:8]}_{os.path.basename(name)}")
+        with open(source_path, 'wb') as f:
+            f.write(data)
+        try:
+            return self.cache.store(key, ext, lambda out: self._normalize_video(source_path, out, width, height, fps))
+        finally:
+            os.remove(source_path)
+
+    @staticmethod
+    def _normalize_image(data, output_path, width, height):
+        # Same stretch-to-frame as clip.resize(newsize=(width, height)), after EXIF rotation
+        Image.fromarray(decode_image(data, width, height)).save(output_path, format='PNG', compress_level=1)
+
+    @staticmethod
+    def _normalize_video(source_path, output_path, width, height, fps):
+        # H.264 uploads already at the target size: copy whole GOPs, re-encode only the cut GOP
+        if keyframe_index.can_copy(source_path, width, height):
+            try:
+                report = keyframe_index.trim(source_path, output_path, MAX_CLIP_SECONDS, MEZZANINE_VIDEO_ARGS)
+                logger.info(f"Stream-copied {os.path.basename(source_path)}: {report}")
+                return
+            except (RuntimeError, ValueError) as e:
+                logger.warning(f"Stream-copy trim failed for {source_path}, re-encoding: {e}")
+        MediaIngest._reencode_video(source_path, output_path, width, height, fps)
+
+    @staticmethod
+    def _reencode_video(source_path, output_path, width, height, fps):
+        run_ffmpeg([
+            '-t', MAX_CLIP_SECONDS, '-i', source_path,
+            '-vf', f"scale={width}:{height},setsar=1,fps={fps},format=yuv420p",
+        ] + MEZZANINE_VIDEO_ARGS + [
+            '-g', fps, '-c:a', 'aac', '-b:a', '128k', '-f', 'mp4', output_path
+        ])
+
+
+# Singleton instance
+media_ingest = MediaIngest()
@@ -0,0 +1,109 @@
+"""
+Media probing helpers built on ffprobe, with MoviePy's ffmpeg parser as fallback
+"""
+import re
+import json
+import subprocess
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def probe_media(path):
+    """Return ffprobe's format/stream description of a media file as a dict"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+        capture_output=True, text=True, timeout=30
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {path}: {result.stderr.strip()[-300:]}")
+    return json.loads(result.stdout)
+
+
+def get_duration(path):
+    """Duration of a media file in seconds"""
+    try:
+        info = probe_media(path)
+        return float(info['format']['duration'])
+    except (FileNotFoundError, RuntimeError, KeyError, ValueError) as e:
+        logger.info(f"ffprobe duration unavailable for {path} ({e}), using ffmpeg parser")
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+        return float(ffmpeg_parse_infos(path)['duration'])
+
+
+def get_video_stream(path):
+    """First video stream description: codec_name, width, height, pix_fmt"""
+    try:
+        info = probe_media(path)
+        for stream in info.get('streams', []):
+            if stream.get('codec_type') == 'video':
+                return stream
+        return None
+    except (FileNotFoundError, RuntimeError, ValueError) as e:
+        logger.info(f"ffprobe unavailable for {path} ({e}), parsing ffmpeg banner")
+        return _parse_ffmpeg_banner(path)
+
+
+def has_audio_stream(path):
+    """True when the file contains at least one audio stream"""
+    try:
+        info = probe_media(path)
+        return any(s.get('codec_type') == 'audio' for s in info.get('streams', []))
+    except (FileNotFoundError, RuntimeError, ValueError):
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+        return bool(ffmpeg_parse_infos(path).get('audio_found'))
+
+
+def get_audio_codec(path):
+    """Codec name of the first audio stream, or None when the file has no audio"""
+    try:
+        info = probe_media(path)
+        for stream in info.get('streams', []):
+            if stream.get('codec_type') == 'audio':
+                return stream.get('codec_name')
+        return None
+    except (FileNotFoundError, RuntimeError, ValueError) as e:
+        logger.info(f"ffprobe unavailable for {path} ({e}), parsing ffmpeg banner")
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-i', path], capture_output=True, text=True, timeout=30)
+        match = re.search(r"Stream #\d+:\d+.*?: Audio: (\w+)", result.stderr)
+        return match.group(1) if match else None
+
+
+def _parse_ffmpeg_banner(path):
+    """Minimal video stream info from `ffmpeg -i` output when ffprobe is missing"""
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-i', path], capture_output=True, text=True, timeout=30)
+    match = re.search(r"Stream #\d+:\d+.*?: Video: (\w+)[^,]*, (\w+)(?:\([^)]*\))?[^,]*, (\d+)x(\d+)", result.stderr)
+    if not match:
+        return None
+    stream = {
+        'codec_type': 'video',
+        'codec_name': match.group(1),
+        'pix_fmt': match.group(2),
+        'width': int(match.group(3)),
+        'height': int(match.group(4)),
+    }
+    rotation = re.search(r"displaymatrix: rotation of (-?[\d.]+) degrees", result.stderr)
+    if rotation:
+        stream['side_data_list'] = [{'rotation': float(rotation.group(1))}]
+    return stream
+
+
+def video_rotation(stream):
+    """Display rotation of a video stream description in degrees (0 when unrotated)"""
+    for side_data in stream.get('side_data_list', []):
+        if 'rotation' in side_data:
+            return int(round(float(side_data['rotation'])))
+    return int(stream.get('tags', {}).get('rotate', 0))
+
+
+def can_stream_copy(path, codec='h264', pix_fmt='yuv420p'):
+    """True when the file's video stream can go into the output MP4 without re-encoding"""
+    stream = get_video_stream(path)
+    if not stream:
+        return False
+    return stream.get('codec_name') == codec and stream.get('pix_fmt', pix_fmt) == pix_fmt
+
+
+def can_stream_copy_audio(path, codec='aac'):
+    """True when the file's audio stream can go into the output MP4 without re-encoding"""
+    return get_audio_codec(path) == codec
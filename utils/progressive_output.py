@@ -0,0 +1,81 @@
+"""
+Progressive output: fragmented MP4 (and optionally an HLS event playlist) that a player can
+start on while frames are still being encoded, remuxed to a faststart MP4 once finished
+"""
+import os
+import time
+import logging
+
+from utils.ffmpeg_renderer import run_ffmpeg
+
+logger = logging.getLogger(__name__)
+
+# moov up front, then one moof/mdat fragment per keyframe (every GOP)
+FRAGMENT_MOVFLAGS = '+frag_keyframe+empty_moov+default_base_moof'
+# Target length of the HLS media segments
+HLS_SEGMENT_SECONDS = 2
+# Minimum seconds between two preview refreshes
+PREVIEW_INTERVAL = 3.0
+
+
+def fragmented_output(partial_path, hls_dir=None):
+    """(ffmpeg output args, output target) writing fragmented MP4, plus HLS in hls_dir when given
+
+    The HLS playlist uses fMP4 segments, so it shares the encode with the MP4 through the tee muxer.
+    """
+    if not hls_dir:
+        return ['-movflags', FRAGMENT_MOVFLAGS, '-flush_packets', '1', '-f', 'mp4'], partial_path
+    os.makedirs(hls_dir, exist_ok=True)
+    segment_pattern = os.path.join(hls_dir, 'segment_%03d.m4s')
+    target = (
+        f"[f=mp4:movflags={FRAGMENT_MOVFLAGS}:flush_packets=1]{partial_path}|"
+        f"[f=hls:hls_time={HLS_SEGMENT_SECONDS}:hls_playlist_type=event:hls_segment_type=fmp4:"
+        f"hls_segment_filename={segment_pattern}]{os.path.join(hls_dir, 'index.m3u8')}"
+    )
+    # tee hides the muxers from the encoder: ask for out-of-band parameter sets explicitly
+    return ['-flags', '+global_header', '-f', 'tee'], target
+
+
+def finalize(partial_path, output_path):
+    """Remux a finished fragmented MP4 into a faststart MP4 (stream copy) and remove the fragments file"""
+    run_ffmpeg(['-i', partial_path, '-map', '0', '-c', 'copy', '-movflags', '+faststart', output_path])
+    os.remove(partial_path)
+    return output_path
+
+
+class ProgressivePreview:
+    """Progress hook for FramePipeline.write: hands the growing fragmented file to callback
+
+    callback(partial_path, seconds_encoded) runs on the rendering thread, at most
+    every PREVIEW_INTERVAL seconds and only when new fragments were written.
+    """
+
+    def __init__(self, partial_path, fps, callback, interval=PREVIEW_INTERVAL):
+        self.partial_path = partial_path
+        self.fps = fps
+        self.callback = callback
+        self.interval = interval
+        self.last_size = 0
+        self.last_update = 0.0
+        self.updates = 0
+
+    def __call__(self, frames):
+        now = time.perf_counter()
+        if now - self.last_update < self.interval or not os.path.exists(self.partial_path):
+            return
+        size = os.path.getsize(self.partial_path)
+        if size <= self.last_size or not self._has_fragment():
+            return
+        self.last_size, self.last_update = size, now
+        try:
+            self.callback(self.partial_path, frames / self.fps)
+            self.updates += 1
+        except Exception as e:
+            logger.warning(f"Preview update failed: {e}")
+
+    def _has_fragment(self):
+        # Until the first GOP is flushed the file holds only the empty moov
+        if self.updates:
+            return True
+        with open(self.partial_path, 'rb') as f:
+            return b'moof' in f.read(65536)
@@ -0,0 +1,171 @@
+"""
+Quality-targeted encoding: trial-encode a few short windows sampled from the timeline at
+candidate CRFs, score them against the source frames with block SSIM / PSNR (numpy), and
+keep the cheapest CRF that meets a quality floor
+"""
+import os
+import time
+import uuid
+import tempfile
+import subprocess
+import logging
+
+import numpy as np
+
+from utils.encode_profiles import get_encode_profile, ffmpeg_video_args
+from utils.yuv_compositor import background_planes
+
+logger = logging.getLogger(__name__)
+
+# Quality floors: minimum SSIM (luma, detailed blocks) of the worst sampled window
+QUALITY_TARGETS = {
+    'standard': {'name': 'Standar (SSIM ≥ 0.95)', 'ssim': 0.95},
+    'high': {'name': 'Tinggi (SSIM ≥ 0.97)', 'ssim': 0.97},
+    'very_high': {'name': 'Sangat tinggi (SSIM ≥ 0.985)', 'ssim': 0.985},
+}
+
+# Sampled windows: consecutive frames, so P/B-frame quality is part of the score
+SAMPLE_WINDOWS = 3
+WINDOW_FRAMES = 8
+# CRF search range (x264/x265/libvpx all accept it)
+CRF_RANGE = (16, 42)
+# SSIM block size and the luma variance that marks a block as detailed
+SSIM_BLOCK = 8
+DETAIL_VARIANCE = 25.0
+
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def block_ssim(reference, distorted, block=SSIM_BLOCK):
+    """(SSIM per block, reference variance per block) of two uint8 planes, non-overlapping blocks"""
+    height, width = reference.shape
+    height, width = height - height % block, width - width % block
+    a = reference[:height, :width].astype('float32').reshape(height // block, block, width // block, block)
+    b = distorted[:height, :width].astype('float32').reshape(height // block, block, width // block, block)
+    mu_a, mu_b = a.mean(axis=(1, 3)), b.mean(axis=(1, 3))
+    var_a = (a * a).mean(axis=(1, 3)) - mu_a * mu_a
+    var_b = (b * b).mean(axis=(1, 3)) - mu_b * mu_b
+    covariance = (a * b).mean(axis=(1, 3)) - mu_a * mu_b
+    ssim = ((2 * mu_a * mu_b + _C1) * (2 * covariance + _C2)) / (
+        (mu_a * mu_a + mu_b * mu_b + _C1) * (var_a + var_b + _C2)
+    )
+    return ssim, var_a
+
+
+def frame_scores(reference, distorted):
+    """(SSIM, PSNR) of a luma plane; SSIM is taken over the detailed blocks when the frame has any
+
+    Flat areas (black text_only backgrounds) score ~1.0 at any CRF and would hide damage
+    to the few words on screen.
+    """
+    ssim, variance = block_ssim(reference, distorted)
+    detailed = variance > DETAIL_VARIANCE
+    score = float(ssim[detailed].mean()) if detailed.any() else float(ssim.mean())
+    mse = float(np.mean((reference.astype('float32') - distorted.astype('float32')) ** 2))
+    psnr = 100.0 if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+    return score, float(psnr)
+
+
+def sample_windows(clip, fps, duration, windows=SAMPLE_WINDOWS, frames=WINDOW_FRAMES):
+    """[(Y plane, UV planes)] of windows evenly spread over the clip, frames consecutive within each"""
+    total = int(duration * fps)
+    frames = min(frames, max(1, total // windows))
+    samples = []
+    for window in range(windows):
+        first = int((window + 0.5) * total / windows) - frames // 2
+        for index in range(max(0, first), max(0, first) + frames):
+            rgb = clip.get_frame(min(index, total - 1) / fps)
+            samples.append(background_planes(np.asarray(rgb)[..., :3]))
+    return samples
+
+
+def _trial(samples, width, height, fps, video_args):
+    """Encode the sampled frames with video_args and decode them back; returns (luma planes, bytes)"""
+    encoded_path = os.path.join(tempfile.gettempdir(), f"trial_{uuid.uuid4().hex[:8]}.mp4")
+    try:
+        encode = subprocess.Popen(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', 'yuv420p',
+             '-s', f"{width}x{height}", '-r', str(fps), '-i', '-'] + list(video_args) + [encoded_path],
+            stdin=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        for y_plane, uv_planes in samples:
+            encode.stdin.write(y_plane.data)
+            encode.stdin.write(uv_planes.data)
+        _, stderr = encode.communicate()
+        if encode.returncode != 0:
+            raise RuntimeError(f"Trial encode failed: {stderr.decode('utf-8', 'replace').strip()[-300:]}")
+        size = os.path.getsize(encoded_path)
+
+        decoded = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', encoded_path, '-f', 'rawvideo',
+             '-pix_fmt', 'yuv420p', '-fps_mode', 'passthrough', '-'],
+            capture_output=True, timeout=300
+        )
+        if decoded.returncode != 0:
+            raise RuntimeError(f"Trial decode failed: {decoded.stderr.decode('utf-8', 'replace').strip()[-300:]}")
+        frames = np.frombuffer(decoded.stdout, dtype='uint8').reshape(-1, width * height * 3 // 2)
+        return [frame[:width * height].reshape(height, width) for frame in frames], size
+    finally:
+        if os.path.exists(encoded_path):
+            os.remove(encoded_path)
+
+
+def with_crf(profile, crf):
+    """Copy of profile in CRF mode at crf; a fixed bitrate is dropped, a cap (maxrate, VP9 ceiling) is kept"""
+    fitted = dict(profile, crf=crf)
+    if profile['crf'] is None:
+        fitted['bitrate'] = '0' if profile['codec'] == 'libvpx-vp9' else None
+    return fitted
+
+
+def choose_crf(clip, profile_name, fps, duration, mode='video', min_ssim=QUALITY_TARGETS['high']['ssim']):
+    """Cheapest CRF whose worst sampled window keeps min_ssim; returns (profile, report)
+
+    Binary search over CRF_RANGE, one trial encode of all sampled windows per step. When
+    even the lowest CRF misses the floor, that CRF is used and the report says met=False.
+    """
+    started = time.perf_counter()
+    width, height = clip.size
+    samples = sample_windows(clip, fps, duration)
+    per_window = len(samples) // SAMPLE_WINDOWS or 1
+    base = get_encode_profile(profile_name)
+    trials = {}
+
+    def evaluate(crf):
+        decoded, size = _trial(samples, width, height, fps, ffmpeg_video_args(with_crf(base, crf), fps, mode))
+        scores = [frame_scores(y_plane, test) for (y_plane, _), test in zip(samples, decoded)]
+        windows = [scores[i:i + per_window] for i in range(0, len(scores), per_window)]
+        trials[crf] = {
+            'ssim': round(float(min(np.mean([s for s, _ in w]) for w in windows)), 4),
+            'psnr': round(float(min(np.mean([p for _, p in w]) for w in windows)), 2),
+            'kbps': round(size * 8 / 1024 / (len(samples) / fps)),
+        }
+        return trials[crf]['ssim'] >= min_ssim
+
+    low, high = CRF_RANGE
+    best = low
+    while low <= high:
+        crf = (low + high) // 2
+        if evaluate(crf):
+            best, low = crf, crf + 1
+        else:
+            high = crf - 1
+    if best not in trials:
+        evaluate(best)
+
+    met = trials[best]['ssim'] >= min_ssim
+    logger.info("Quality target %.3f: CRF %d after %d trial encodes (met: %s)", min_ssim, best, len(trials), met)
+    report = {
+        'min_ssim': min_ssim,
+        'met': met,
+        'profile_rate': f"CRF {base['crf']}" if base['crf'] is not None else base['bitrate'],
+        'crf': best,
+        'ssim': trials[best]['ssim'],
+        'psnr': trials[best]['psnr'],
+        'sample_kbps': trials[best]['kbps'],
+        'trials': {str(crf): trial for crf, trial in sorted(trials.items())},
+        'sampled_frames': len(samples),
+        'analysis_time': round(time.perf_counter() - started, 3),
+    }
+    return with_crf(base, best), report
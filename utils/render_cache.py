@@ -0,0 +1,80 @@
+"""
+Content-addressed file cache for render intermediates (normalized media, segments, audio)
+"""
+import os
+import time
+import uuid
+import hashlib
+import tempfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_ROOT = os.path.join(tempfile.gettempdir(), 'ai_video_cache')
+
+
+def hash_bytes(data):
+    """sha256 hex digest of raw bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """sha256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RenderCache:
+    def __init__(self, namespace):
+        self.cache_dir = os.path.join(CACHE_ROOT, namespace)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        """Stable key from any number of string-able parts"""
+        return hashlib.sha256('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+    def path(self, key, ext):
+        return os.path.join(self.cache_dir, f"{key}{ext}")
+
+    def get(self, key, ext):
+        """Cached file path, or None on a miss (hits refresh the mtime used for pruning)"""
+        path = self.path(key, ext)
+        if os.path.exists(path):
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            return path
+        return None
+
+    def store(self, key, ext, producer):
+        """Run producer(tmp_path) and atomically publish its output under key"""
+        path = self.path(key, ext)
+        tmp_path = os.path.join(self.cache_dir, f".{key}.{uuid.uuid4().hex[:8]}{ext}")
+        try:
+            producer(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+
+def prune_cache(max_age):
+    """Delete cache entries not used for max_age seconds; returns the number removed"""
+    removed = 0
+    now = time.time()
+    for root, _, files in os.walk(CACHE_ROOT):
+        for filename in files:
+            path = os.path.join(root, filename)
+            try:
+                if now - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+                    removed += 1
+            except OSError as e:
+                logger.warning(f"Could not prune cache file {path}: {e}")
+    return removed
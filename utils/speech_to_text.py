@@ -3,6 +3,7 @@ import tempfile
 import streamlit as st
 from utils.compatibility import sanitize_filename
 from utils.ffmpeg_checker import check_ffmpeg
+from utils.render_cache import RenderCache, hash_bytes
 import logging
 import speech_recognition as sr
 from pydub import AudioSegment
@@ -12,6 +13,7 @@ logger = logging.getLogger(__name__)
 class SpeechToText:
     def __init__(self):
         self.temp_dir = tempfile.gettempdir()
+        self.cache = RenderCache('transcripts')
         self.supported_languages = {
             'id': 'id-ID',
             'en': 'en-US',
@@ -116,6 +118,15 @@ class SpeechToText:
     def transcribe_video(self, video_file, language='id'):
         """Main function untuk transcribe video ke text"""
         try:
+            # Transcripts are cached by video content and language (draft and final renders share them)
+            data = video_file.getvalue()
+            cache_key = self.cache.key(hash_bytes(data), language)
+            cached = self.cache.get(cache_key, '.txt')
+            if cached:
+                st.info("♻️ Menggunakan transkripsi tersimpan")
+                with open(cached, 'r', encoding='utf-8') as f:
+                    return f.read()
+
             # Save uploaded video temporarily
             temp_video_path = os.path.join(
                 self.temp_dir,
@@ -123,7 +134,7 @@ class SpeechToText:
             )
 
             with open(temp_video_path, 'wb') as f:
-                f.write(video_file.getvalue())
+                f.write(data)
 
             st.info("📹 Mengekstrak audio dari video...")
 
@@ -145,6 +156,8 @@ class SpeechToText:
             except Exception as e:
                 logger.warning(f"Failed to clean up temporary files: {str(e)}")
 
+            if transcribed_text:
+                self.cache.store(cache_key, '.txt', lambda out: self._write_text(out, transcribed_text))
             return transcribed_text
 
         except Exception as e:
@@ -152,6 +165,11 @@ class SpeechToText:
             st.error(f"❌ Transkripsi video gagal: {str(e)}")
             return None
 
+    @staticmethod
+    def _write_text(path, text):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
     def get_supported_languages(self):
         """Get list of supported languages"""
         return {
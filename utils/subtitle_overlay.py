@@ -0,0 +1,158 @@
+"""
+Reusable subtitle layer: the karaoke rendered once as an alpha video (cached by script,
+timings and style) and laid over the frames by the ffmpeg that encodes the final output
+"""
+import os
+import json
+import tempfile
+import subprocess
+import logging
+
+import numpy as np
+
+from utils.render_cache import RenderCache
+from utils.karaoke_overlay import SegmentIndex
+
+logger = logging.getLogger(__name__)
+
+# Bump when the overlay rendering changes so stale entries are not reused
+OVERLAY_VERSION = 1
+
+# Alpha-capable intermediates: encoder args, container, decoder args needed to keep the alpha
+OVERLAY_CODECS = {
+    # Lossless RLE that only stores changed lines: tiny and fast for mostly static text
+    'qtrle': {'args': ['-c:v', 'qtrle', '-pix_fmt', 'argb'], 'ext': '.mov', 'decoder': []},
+    'prores4444': {
+        'args': ['-c:v', 'prores_ks', '-profile:v', '4444', '-pix_fmt', 'yuva444p10le'],
+        'ext': '.mov', 'decoder': [],
+    },
+    # FFmpeg's native VP9 decoder drops the alpha plane; libvpx keeps it
+    'vp9': {
+        'args': ['-c:v', 'libvpx-vp9', '-pix_fmt', 'yuva420p', '-b:v', '0', '-crf', '30', '-row-mt', '1'],
+        'ext': '.webm', 'decoder': ['-c:v', 'libvpx-vp9'],
+    },
+}
+DEFAULT_OVERLAY_CODEC = 'qtrle'
+
+
+class SubtitleOverlay:
+    """A cached overlay: path, codec and where its text band goes on the frame"""
+
+    def __init__(self, path, codec, top, width, height, fps, duration, cached):
+        self.path = path
+        self.codec = codec
+        self.top = top
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.duration = duration
+        self.cached = cached
+
+    @property
+    def input_args(self):
+        """ffmpeg input arguments that decode the overlay with its alpha plane"""
+        return OVERLAY_CODECS[self.codec]['decoder'] + ['-i', self.path]
+
+    def report(self):
+        return {
+            'codec': self.codec,
+            'band': f"{self.width}x{self.height}+{self.top}",
+            'size_kb': round(os.path.getsize(self.path) / 1024, 1),
+            'cached': self.cached,
+        }
+
+
+class SubtitleOverlayRenderer:
+    def __init__(self):
+        self.cache = RenderCache('overlays')
+
+    def overlay_key(self, timings, style, width, height, fps, duration, codec):
+        """Key of an overlay: the timed script, text style and output geometry"""
+        script = [(t['text'], round(t['start_time'], 3), round(t['end_time'], 3)) for t in timings]
+        return self.cache.key(script, style, width, height, fps, round(duration, 3), codec, OVERLAY_VERSION)
+
+    def get(self, key, codec):
+        """Cached SubtitleOverlay for key, or None"""
+        path = self.cache.get(key, OVERLAY_CODECS[codec]['ext'])
+        meta_path = self.cache.get(key, '.json')
+        if not path or not meta_path:
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return SubtitleOverlay(path, codec, cached=True, **meta)
+
+    def render(self, key, overlays, width, height, fps, duration, codec=DEFAULT_OVERLAY_CODEC):
+        """Encode overlays (start, end, TextBitmap, (x, y)) as an alpha video of their text band"""
+        placed = []
+        for start, end, bitmap, (x, y) in overlays:
+            if x == 'center':
+                x = (width - bitmap.w) // 2
+            placed.append((start, end, (bitmap, int(x), int(y))))
+        if not placed:
+            raise ValueError("No subtitle overlays to render")
+
+        # Only the rows any text can reach are stored; even bounds keep chroma aligned on the overlay pass
+        top = max(0, min(y for _, _, (_, _, y) in placed)) & ~1
+        bottom = min(height, max(y + bitmap.h for _, _, (bitmap, _, y) in placed))
+        bottom += (bottom - top) % 2
+        band_height = bottom - top
+        index = SegmentIndex(placed)
+
+        config = OVERLAY_CODECS[codec]
+        meta = {'top': top, 'width': width, 'height': band_height, 'fps': fps, 'duration': duration}
+
+        def encode(output_path):
+            cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f"{width}x{band_height}", '-r', str(fps), '-i', '-']
+            cmd += config['args'] + ['-f', 'mov' if config['ext'] == '.mov' else 'webm', output_path]
+            logger.info("Running: %s", ' '.join(cmd))
+            with tempfile.TemporaryFile() as stderr:
+                process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr)
+                try:
+                    last_active, frame = None, None
+                    for frame_index in range(int(round(duration * fps))):
+                        active = index.active(frame_index / fps)
+                        # The text only changes at word boundaries: recompose only then
+                        if frame is None or [id(p) for p in active] != last_active:
+                            frame = self._compose(active, width, top, band_height)
+                            last_active = [id(p) for p in active]
+                        process.stdin.write(frame.data)
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                if process.wait() != 0:
+                    stderr.seek(0)
+                    message = stderr.read().decode('utf-8', 'replace').strip()[-500:]
+                    raise RuntimeError(f"ffmpeg failed: {message or process.returncode}")
+
+        def write_meta(output_path):
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+
+        path = self.cache.store(key, config['ext'], encode)
+        self.cache.store(key, '.json', write_meta)
+        return SubtitleOverlay(path, codec, cached=False, **meta)
+
+    @staticmethod
+    def _compose(active, width, top, band_height):
+        """Straight-alpha RGBA band with the active bitmaps drawn over each other"""
+        band = np.zeros((band_height, width, 4), dtype='uint8')
+        for bitmap, x, y in active:
+            y -= top
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + bitmap.w, width), min(y + bitmap.h, band_height)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            region = band[y0:y1, x0:x1].astype('float32') / 255.0
+            src_rgb = bitmap.rgb[y0 - y:y1 - y, x0 - x:x1 - x].astype('float32') / 255.0
+            src_a = bitmap.alpha[y0 - y:y1 - y, x0 - x:x1 - x, None].astype('float32') / 255.0
+            dst_a = region[..., 3:]
+            out_a = src_a + dst_a * (1.0 - src_a)
+            out_rgb = (src_rgb * src_a + region[..., :3] * dst_a * (1.0 - src_a)) / np.maximum(out_a, 1e-6)
+            band[y0:y1, x0:x1, :3] = np.rint(out_rgb * 255.0)
+            band[y0:y1, x0:x1, 3:] = np.rint(out_a * 255.0)
+        return band
+
+
+# Singleton instance
+subtitle_overlay_renderer = SubtitleOverlayRenderer()
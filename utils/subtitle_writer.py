@@ -0,0 +1,123 @@
+"""
+Subtitle script writers: karaoke timings + TextEffects styles to ASS, timings to WebVTT
+"""
+import os
+
+from utils.text_renderer import load_font, parse_color
+
+
+def ass_color(color, alpha=0):
+    """CSS/hex color to ASS &HAABBGGRR notation"""
+    r, g, b = parse_color(color)
+    return f"&H{alpha:02X}{b:02X}{g:02X}{r:02X}"
+
+
+def ass_timestamp(seconds):
+    """Seconds to ASS H:MM:SS.cc"""
+    centiseconds = int(round(max(0.0, seconds) * 100))
+    hours, rem = divmod(centiseconds, 360000)
+    minutes, rem = divmod(rem, 6000)
+    secs, cs = divmod(rem, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{cs:02d}"
+
+
+def escape_ass_text(text):
+    """Escape override braces and line breaks for an ASS Dialogue line"""
+    return text.replace('\\', '\\\\').replace('{', '\\{').replace('}', '\\}').replace('\n', '\\N')
+
+
+def resolve_font_family(font_name, font_size):
+    """Family name and font directory of the font the rasterizer would use, for libass"""
+    font = load_font(font_name, font_size)
+    family, _ = font.getname()
+    path = getattr(font, 'path', None)
+    fonts_dir = os.path.dirname(path) if isinstance(path, str) else None
+    return family, fonts_dir
+
+
+def subtitle_margin(text_position, height):
+    """Top margin matching the MoviePy placement of karaoke text"""
+    return int(height * (0.3 if text_position == 'middle' else 0.8))
+
+
+def build_ass_script(timings, width, height, font_size, text_color, text_position,
+                     effect_config, text_effect='none', font_name='Arial-Bold'):
+    """Build an ASS script for karaoke timings styled like the PIL/MoviePy renderer"""
+    family, _ = resolve_font_family(font_name, font_size)
+
+    font_color = effect_config.get('font_color', text_color)
+    if font_color == 'linear':
+        font_color = (effect_config.get('gradient_colors') or [text_color])[0]
+    highlight_color = font_color
+    if text_effect == 'glow':
+        highlight_color = effect_config.get('glow_color', '#FFD700')
+    elif text_effect == 'neon':
+        highlight_color = effect_config.get('neon_color', '#00FFFF')
+
+    outline = effect_config.get('stroke_width', 2)
+    shadow_depth = max(effect_config.get('shadow_offset', (2, 2))) if effect_config.get('shadow') else 0
+    back_color = effect_config.get('shadow_color', '#000000')
+    glow_tag = ''
+    if effect_config.get('glow_color') or effect_config.get('neon_color'):
+        glow_tag = f"{{\\blur{effect_config.get('glow_intensity', 2) * 2}}}"
+
+    margin_v = subtitle_margin(text_position, height)
+    margin_h = int(width * 0.05)
+    style_fields = (f"{family},{font_size},{{primary}},&H000000FF,{ass_color(effect_config.get('stroke_color', 'black'))},"
+                    f"{ass_color(back_color, 0x40)},-1,0,0,0,100,100,0,0,1,{outline},{shadow_depth},8,"
+                    f"{margin_h},{margin_h},{margin_v},1")
+
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        "Style: Karaoke," + style_fields.format(primary=ass_color(font_color)),
+        "Style: Punctuation," + style_fields.format(primary=ass_color(highlight_color)),
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+
+    for timing in timings:
+        if timing['end_time'] <= timing['start_time']:
+            continue
+        style = 'Punctuation' if timing.get('punctuation') in ('.', '!', '?') else 'Karaoke'
+        lines.append(
+            f"Dialogue: 0,{ass_timestamp(timing['start_time'])},{ass_timestamp(timing['end_time'])},"
+            f"{style},,0,0,0,,{glow_tag}{escape_ass_text(timing['text'])}"
+        )
+
+    return '\n'.join(lines) + '\n'
+
+
+def vtt_timestamp(seconds):
+    """Seconds to WebVTT HH:MM:SS.mmm"""
+    milliseconds = int(round(max(0.0, seconds) * 1000))
+    hours, rem = divmod(milliseconds, 3600000)
+    minutes, rem = divmod(rem, 60000)
+    secs, ms = divmod(rem, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{ms:03d}"
+
+
+def build_webvtt(timings):
+    """Build a WebVTT track from karaoke timings (one cue per segment)"""
+    lines = ["WEBVTT", ""]
+    for number, timing in enumerate(timings, start=1):
+        if timing['end_time'] <= timing['start_time']:
+            continue
+        text = timing['text'] + timing.get('punctuation', '')
+        lines += [
+            str(number),
+            f"{vtt_timestamp(timing['start_time'])} --> {vtt_timestamp(timing['end_time'])}",
+            text.replace('-->', '->'),
+            "",
+        ]
+    return '\n'.join(lines)
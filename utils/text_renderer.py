@@ -0,0 +1,257 @@
+"""
+PIL/FreeType text rasterizer with a per-job word bitmap atlas
+"""
+import os
+import math
+import time
+import logging
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageColor
+
+logger = logging.getLogger(__name__)
+
+# Rough wall time of one ImageMagick-backed TextClip (process launch + render),
+# used to estimate the time the atlas saves per job
+TEXTCLIP_ESTIMATED_COST = 0.15
+
+FONT_DIRS = [
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    os.path.expanduser('~/.fonts'),
+    os.path.expanduser('~/.local/share/fonts'),
+    '/Library/Fonts',
+    '/System/Library/Fonts',
+    'C:\\Windows\\Fonts',
+]
+
+# ImageMagick font names used by the editor mapped to TrueType file candidates
+FONT_CANDIDATES = {
+    'Arial-Bold': ['arialbd.ttf', 'arial bold.ttf', 'arial_bold.ttf',
+                   'liberationsans-bold.ttf', 'dejavusans-bold.ttf', 'freesansbold.ttf'],
+    'Arial': ['arial.ttf', 'liberationsans-regular.ttf', 'dejavusans.ttf', 'freesans.ttf'],
+}
+
+
+@lru_cache(maxsize=1)
+def _font_file_index():
+    """Map lowercase font file names to their paths"""
+    index = {}
+    for font_dir in FONT_DIRS:
+        if not os.path.isdir(font_dir):
+            continue
+        for root, _, files in os.walk(font_dir):
+            for filename in files:
+                if filename.lower().endswith(('.ttf', '.otf')):
+                    index.setdefault(filename.lower(), os.path.join(root, filename))
+    return index
+
+
+@lru_cache(maxsize=64)
+def load_font(font_name, font_size):
+    """Load a FreeType font by ImageMagick-style name, falling back to PIL's bundled font"""
+    if font_name and os.path.isfile(font_name):
+        return ImageFont.truetype(font_name, font_size)
+
+    index = _font_file_index()
+    candidates = FONT_CANDIDATES.get(font_name, []) + [f"{font_name}.ttf".lower()] + FONT_CANDIDATES['Arial-Bold']
+    for candidate in candidates:
+        path = index.get(candidate.lower())
+        if path:
+            try:
+                return ImageFont.truetype(path, font_size)
+            except OSError:
+                continue
+
+    logger.warning(f"No TrueType font found for '{font_name}', using PIL default font")
+    return ImageFont.load_default(size=font_size)
+
+
+def parse_color(color, default=(255, 255, 255)):
+    """Convert a CSS/ImageMagick color name or hex string to an RGB tuple"""
+    try:
+        return ImageColor.getrgb(color)[:3]
+    except (ValueError, AttributeError, TypeError):
+        return default
+
+
+class TextBitmap:
+    """Rasterized text ready for compositing: RGB pixels plus an alpha plane"""
+
+    def __init__(self, rgba):
+        self.rgb = np.ascontiguousarray(rgba[:, :, :3])
+        self.alpha = np.ascontiguousarray(rgba[:, :, 3])
+        self.h, self.w = self.alpha.shape
+
+        # Integer blending planes, computed once per bitmap and cropped to the visible box:
+        # out = (dst * (255 - a) + rgb * a) / 255 stays within uint16
+        rows = np.flatnonzero(self.alpha.any(axis=1))
+        cols = np.flatnonzero(self.alpha.any(axis=0))
+        top, bottom = (rows[0], rows[-1] + 1) if len(rows) else (0, 0)
+        left, right = (cols[0], cols[-1] + 1) if len(cols) else (0, 0)
+        self.box = (int(left), int(top))
+        alpha = self.alpha[top:bottom, left:right, None].astype('uint16')
+        self.premultiplied = self.rgb[top:bottom, left:right].astype('uint16') * alpha
+        self.inverse_alpha = 255 - alpha
+
+    @property
+    def nbytes(self):
+        return self.rgb.nbytes + self.alpha.nbytes + self.premultiplied.nbytes + self.inverse_alpha.nbytes
+
+    @property
+    def size(self):
+        return self.w, self.h
+
+
+class WordAtlas:
+    """Renders each unique (text, font, size, style) once and keeps the bitmap in memory"""
+
+    def __init__(self, font_name='Arial-Bold'):
+        self.font_name = font_name
+        self.bitmaps = {}
+        self.requests = 0
+        self.render_time = 0.0
+
+    def reset(self):
+        """Drop all bitmaps and statistics (called at the start of every job)"""
+        self.bitmaps.clear()
+        self.requests = 0
+        self.render_time = 0.0
+
+    def get(self, text, font_size, style, max_width=None):
+        """Return the TextBitmap for text in the given style, rendering it on first use"""
+        self.requests += 1
+        key = (text, self.font_name, int(font_size), self._style_key(style),
+               int(max_width) if max_width else None)
+        bitmap = self.bitmaps.get(key)
+        if bitmap is None:
+            start = time.perf_counter()
+            bitmap = render_text(text, self.font_name, int(font_size), style, max_width)
+            self.render_time += time.perf_counter() - start
+            self.bitmaps[key] = bitmap
+        return bitmap
+
+    def report(self):
+        """Per-job statistics, including the estimated time saved over per-word TextClips"""
+        estimated_textclip_time = self.requests * TEXTCLIP_ESTIMATED_COST
+        return {
+            'segments': self.requests,
+            'unique_bitmaps': len(self.bitmaps),
+            'cache_hits': self.requests - len(self.bitmaps),
+            'atlas_bytes': sum(b.nbytes for b in self.bitmaps.values()),
+            'render_time': round(self.render_time, 3),
+            'estimated_textclip_time': round(estimated_textclip_time, 3),
+            'estimated_time_saved': round(max(0.0, estimated_textclip_time - self.render_time), 3),
+        }
+
+    @staticmethod
+    def _style_key(style):
+        return tuple(sorted(
+            (k, tuple(v) if isinstance(v, (list, tuple)) else v)
+            for k, v in style.items()
+        ))
+
+
+def text_style(effect_config, font_color=None):
+    """Build the rasterizer style from a TextEffects config"""
+    return {
+        'font_color': font_color or effect_config.get('font_color', '#FFFFFF'),
+        'stroke_color': effect_config.get('stroke_color', 'black'),
+        'stroke_width': effect_config.get('stroke_width', 2),
+        'shadow': effect_config.get('shadow', False),
+        'shadow_color': effect_config.get('shadow_color', '#000000'),
+        'shadow_offset': effect_config.get('shadow_offset', (2, 2)),
+        'glow_color': effect_config.get('glow_color') or effect_config.get('neon_color'),
+        'glow_intensity': effect_config.get('glow_intensity', 2),
+        'gradient_colors': effect_config.get('gradient_colors'),
+    }
+
+
+def _wrap_lines(text, font, max_width, stroke_width):
+    """Greedy word wrap to max_width pixels, like TextClip(method='caption')"""
+    if not max_width:
+        return text
+    lines = []
+    for paragraph in text.split('\n'):
+        current = []
+        for word in paragraph.split():
+            candidate = ' '.join(current + [word])
+            if current and font.getlength(candidate) + 2 * stroke_width > max_width:
+                lines.append(' '.join(current))
+                current = [word]
+            else:
+                current.append(word)
+        lines.append(' '.join(current))
+    return '\n'.join(lines)
+
+
+def render_text(text, font_name, font_size, style, max_width=None):
+    """Rasterize text to an RGBA TextBitmap with stroke, shadow, glow and gradient support"""
+    font = load_font(font_name, font_size)
+    stroke_width = int(style.get('stroke_width') or 0)
+    text = _wrap_lines(text, font, max_width, stroke_width)
+    spacing = max(4, font_size // 8)
+
+    probe = ImageDraw.Draw(Image.new('L', (1, 1)))
+    left, top, right, bottom = probe.multiline_textbbox(
+        (0, 0), text, font=font, spacing=spacing, align='center', stroke_width=stroke_width
+    )
+
+    shadow_dx, shadow_dy = style.get('shadow_offset') or (2, 2)
+    glow_radius = int(style.get('glow_intensity') or 2) * 2 if style.get('glow_color') else 0
+    pad = max(glow_radius * 2, abs(shadow_dx), abs(shadow_dy)) + 2
+    # Multi-line bounding boxes come back as floats
+    width = math.ceil(right - left) + 2 * pad
+    height = math.ceil(bottom - top) + 2 * pad
+    origin = (pad - left, pad - top)
+
+    # Coverage masks for the glyph fill and the stroked outline
+    fill_mask = Image.new('L', (width, height), 0)
+    ImageDraw.Draw(fill_mask).multiline_text(
+        origin, text, font=font, fill=255, spacing=spacing, align='center'
+    )
+    outline_mask = Image.new('L', (width, height), 0)
+    ImageDraw.Draw(outline_mask).multiline_text(
+        origin, text, font=font, fill=255, spacing=spacing, align='center',
+        stroke_width=stroke_width, stroke_fill=255
+    )
+
+    canvas = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+
+    if glow_radius:
+        glow = outline_mask.filter(ImageFilter.MaxFilter(3)).filter(ImageFilter.GaussianBlur(glow_radius))
+        canvas.alpha_composite(_solid_layer(style['glow_color'], glow))
+
+    if style.get('shadow') and not glow_radius:
+        shadow = Image.new('L', (width, height), 0)
+        shadow.paste(outline_mask, (int(shadow_dx), int(shadow_dy)))
+        canvas.alpha_composite(_solid_layer(style.get('shadow_color', '#000000'), shadow))
+
+    if stroke_width:
+        canvas.alpha_composite(_solid_layer(style.get('stroke_color', 'black'), outline_mask))
+
+    gradient_colors = style.get('gradient_colors')
+    if style.get('font_color') == 'linear' and gradient_colors:
+        canvas.alpha_composite(_gradient_layer(gradient_colors, fill_mask))
+    else:
+        canvas.alpha_composite(_solid_layer(style.get('font_color', '#FFFFFF'), fill_mask))
+
+    return TextBitmap(np.asarray(canvas))
+
+
+def _solid_layer(color, mask):
+    layer = Image.new('RGBA', mask.size, parse_color(color) + (0,))
+    layer.putalpha(mask)
+    return layer
+
+
+def _gradient_layer(colors, mask):
+    start = np.array(parse_color(colors[0]), dtype='float32')
+    end = np.array(parse_color(colors[-1]), dtype='float32')
+    ramp = np.linspace(0.0, 1.0, mask.size[0], dtype='float32')[:, None]
+    row = (start + (end - start) * ramp).astype('uint8')
+    rgb = np.broadcast_to(row[None, :, :], (mask.size[1], mask.size[0], 3))
+    layer = Image.fromarray(np.ascontiguousarray(rgb), 'RGB').convert('RGBA')
+    layer.putalpha(mask)
+    return layer
@@ -1,12 +1,29 @@
 from PIL import Image
 import os
+import math
 import uuid
 import tempfile
+import time
+import numpy as np
 import streamlit as st
 from utils.compatibility import sanitize_filename
 from utils.text_processor import text_processor
 from utils.speech_to_text import speech_to_text
 from utils.text_effects import get_text_effect_config
+from utils.text_renderer import WordAtlas, text_style
+from utils.subtitle_writer import build_ass_script, build_webvtt, resolve_font_family
+from utils.ffmpeg_renderer import ffmpeg_renderer, run_ffmpeg
+from utils.media_probe import get_duration, can_stream_copy, can_stream_copy_audio, has_audio_stream
+from utils.parallel_render import parallel_renderer
+from utils.frame_pipeline import frame_pipeline
+from utils.subtitle_overlay import subtitle_overlay_renderer, DEFAULT_OVERLAY_CODEC
+from utils.progressive_output import fragmented_output, finalize, ProgressivePreview
+from utils.size_target import resolve_limit, video_budget_kbps, estimate_bitrate, fit_profile, proxy_size, PROXY_SCALE
+from utils.quality_target import QUALITY_TARGETS, choose_crf
+from utils.audio_track import audio_track_cache
+from utils.media_ingest import media_ingest, decode_image, MAX_CLIP_SECONDS
+from utils.render_cache import hash_file
+from utils.encode_profiles import DEFAULT_ENCODE_PROFILE, moviepy_write_kwargs, ffmpeg_video_args
 from datetime import datetime
 
 # Compatibility fix for Pillow >=10
@@ -16,27 +33,138 @@ if not hasattr(Image, 'ANTIALIAS'):
 # Try to import MoviePy with multiple fallbacks
 MOVIEPY_AVAILABLE = False
 try:
-    from moviepy.editor import VideoFileClip, ImageClip, concatenate_videoclips, CompositeVideoClip, AudioFileClip, TextClip, ColorClip
-    from moviepy.audio.AudioClip import CompositeAudioClip, concatenate_audioclips
+    from moviepy.editor import VideoFileClip, ImageClip, concatenate_videoclips, AudioFileClip, ColorClip
+    from moviepy.audio.AudioClip import CompositeAudioClip
+    from utils.yuv_compositor import overlay_clip, COMPOSITOR_VERSION
+    from utils.looping import loop_clip, loop_audio
     MOVIEPY_AVAILABLE = True
 except ImportError as e:
     st.warning(f"⚠️ MoviePy not available: {e}")
 
+# Output frame rate of the standard (media) timeline
+STANDARD_FPS = 15
+# Output frame rate of the text-only timeline
+TEXT_ONLY_FPS = 24
+# Seconds each still image stays on screen in the standard timeline
+IMAGE_CLIP_SECONDS = 5
+
+# Draft renders: fast previews while tweaking text settings (1080x1920 -> 360x640)
+DRAFT_SCALE = 1 / 3
+DRAFT_FPS = 10
+DRAFT_ENCODE_PROFILE = 'draft'
+
+# Set to 1 to add tracemalloc statistics to every job report (profiling aid, costs snapshots per render)
+TRACE_ALLOCATIONS_ENV = 'AI_VIDEO_TRACE_ALLOCATIONS'
+
+
+def get_frame_size(video_format, quality='final'):
+    """Output (width, height) for a video format and render quality"""
+    width, height = (1080, 1920) if video_format == 'short' else (1920, 1080)
+    if quality == 'draft':
+        # libx264 needs even dimensions
+        width, height = (int(width * DRAFT_SCALE) // 2 * 2, int(height * DRAFT_SCALE) // 2 * 2)
+    return width, height
+
+
+# Renditions a multi-rendition job can produce: name -> (width, height)
+RENDITIONS = {
+    '9:16': (1080, 1920),
+    '9:16-720p': (720, 1280),
+    '16:9': (1920, 1080),
+    '16:9-720p': (1280, 720),
+    '1:1': (1080, 1080),
+    '1:1-720p': (720, 720),
+}
+DEFAULT_RENDITIONS = ('9:16', '16:9', '1:1')
+
+
+def get_rendition_size(name, quality='final'):
+    """Output (width, height) of a named rendition for a render quality"""
+    width, height = RENDITIONS[name]
+    if quality == 'draft':
+        width, height = (int(width * DRAFT_SCALE) // 2 * 2, int(height * DRAFT_SCALE) // 2 * 2)
+    return width, height
+
+
+# ISO 639-2 codes for the soft subtitle track language tag
+SUBTITLE_LANGUAGE_CODES = {
+    'id': 'ind', 'en': 'eng', 'es': 'spa', 'fr': 'fra',
+    'de': 'deu', 'ja': 'jpn', 'ko': 'kor', 'zh': 'zho'
+}
+
 class VideoEditor:
     def __init__(self):
         self.temp_dir = tempfile.gettempdir()
+        self.word_atlas = WordAtlas()
+        self.job_report = {}
+        self.encode_profile = DEFAULT_ENCODE_PROFILE
+        self.workers = 1
+        self.segment_seconds = 4.0
+        self.loop_crossfade = 0.0
+        self.quality = 'final'
+        self.segment_cache = False
+        # tracemalloc statistics of the frame pipelines in the job report (opt-in)
+        self.trace_allocations = False
+        # Alpha intermediate of subtitle_mode='overlay' (utils.subtitle_overlay.OVERLAY_CODECS)
+        self.overlay_codec = DEFAULT_OVERLAY_CODEC
+        # Progressive output of the current job (see create_video)
+        self.preview_callback = None
+        self.hls_dir = None
+        # Quality floor of the current job (utils.quality_target.QUALITY_TARGETS key or SSIM)
+        self.quality_target = None
 
     def create_video(self, media_files, audio_path, duration, video_format='short',
                     subtitle_text="", font_size=60, text_color='white',
                     text_position='middle', font_name='Arial-Bold',
                     background_music=None, music_volume=0.3,
                     mode='video', auto_subtitle=False, subtitle_language='id',
-                    text_effect='none'):
-        """Create video with text effects"""
+                    text_effect='none', render_backend='moviepy', subtitle_mode='burn',
+                    workers=1, segment_seconds=4.0, loop_crossfade=0.0,
+                    encode_profile=DEFAULT_ENCODE_PROFILE, quality='final', segment_cache=False,
+                    preview_callback=None, hls_dir=None, size_limit=None, quality_target=None,
+                    trace_allocations=None):
+        """Create video with text effects
+
+        render_backend: 'moviepy' (frame-by-frame compositing) or 'ffmpeg'
+        (single ffmpeg/libass filtergraph, falls back to MoviePy on failure)
+        subtitle_mode: 'burn' draws the karaoke into the pixels, 'soft' muxes it
+        as a mov_text track and stream-copies the video when the codec matches,
+        'overlay' renders it once as a cached alpha video laid over the text-free background
+        workers / segment_seconds: render GOP-aligned time ranges of that length in
+        separate processes and stitch them with the concat demuxer (MoviePy backend)
+        loop_crossfade: seconds of crossfade at each seam when narration is looped
+        encode_profile: name from utils.encode_profiles (preset, CRF/bitrate, tune, codec)
+        quality: 'final' or 'draft' (reduced size and fps, ultrafast encode, no music);
+        transcripts, narration and normalized uploads are shared between the two
+        segment_cache: reuse encoded segments whose media, subtitle words, style, font and
+        encode settings are unchanged since an earlier render (MoviePy backend); renders
+        longer than one segment are then encoded as closed-GOP segments and stitched
+        preview_callback(partial_path, seconds): the MoviePy backend encodes in one pass to a
+        fragmented MP4 and hands it over while it grows; hls_dir also writes an HLS event
+        playlist there. The returned file is remuxed to faststart either way.
+        size_limit: utils.size_target.PLATFORM_LIMITS key or megabytes; the encode profile
+        is rate-controlled to land under it (see check_size_target)
+        quality_target: utils.quality_target.QUALITY_TARGETS key or minimum SSIM; the MoviePy
+        timeline is trial-encoded on sampled windows and encoded at the highest CRF that keeps it
+        trace_allocations: add tracemalloc statistics to the job report (default: the
+        AI_VIDEO_TRACE_ALLOCATIONS environment variable set to 1)
+        """
+        started = time.perf_counter()
         try:
             if not MOVIEPY_AVAILABLE:
                 return self._create_fallback_video(media_files, audio_path, duration, video_format)
 
+            font_size, background_music = self._configure_job(
+                media_files if mode != 'text_only' else [], video_format, font_size, background_music,
+                workers, segment_seconds, loop_crossfade, encode_profile, quality, segment_cache,
+                preview_callback, hls_dir
+            )
+            # Draft renders keep their ultrafast profile
+            self.quality_target = quality_target if quality != 'draft' else None
+            if trace_allocations is None:
+                trace_allocations = os.environ.get(TRACE_ALLOCATIONS_ENV) == '1'
+            self.trace_allocations = bool(trace_allocations)
+
             # Get text effect config
             effect_config = get_text_effect_config(text_effect)
 
@@ -52,6 +180,47 @@ class VideoEditor:
                 else:
                     st.warning("⚠️ Could not extract subtitles, using provided text")
 
+            if size_limit:
+                # Burned-in karaoke (not a soft track) is part of the size analysis
+                self._fit_size_limit(
+                    size_limit, media_files if mode != 'text_only' else [], audio_path, duration, video_format,
+                    render_backend, final_subtitle_text if subtitle_mode != 'soft' else '',
+                    (font_size, text_color, text_position, text_effect)
+                )
+
+            if subtitle_mode == 'overlay' and final_subtitle_text:
+                try:
+                    st.info("🧩 Adding karaoke as a reusable transparent overlay...")
+                    return self._create_overlay_subtitle_video(
+                        media_files if mode != 'text_only' else [], audio_path, duration, video_format,
+                        final_subtitle_text, font_size, text_color, text_position,
+                        background_music, music_volume, text_effect, render_backend
+                    )
+                except Exception as e:
+                    st.warning(f"⚠️ Subtitle overlay failed, burning subtitles in instead: {str(e)}")
+
+            if subtitle_mode == 'soft' and final_subtitle_text:
+                try:
+                    st.info("💬 Adding karaoke as a soft subtitle track...")
+                    return self._create_soft_subtitle_video(
+                        media_files if mode != 'text_only' else [], audio_path, duration, video_format,
+                        final_subtitle_text, font_size, text_color, text_position,
+                        background_music, music_volume, text_effect, subtitle_language, render_backend
+                    )
+                except Exception as e:
+                    st.warning(f"⚠️ Soft subtitles failed, burning subtitles in instead: {str(e)}")
+
+            if render_backend == 'ffmpeg':
+                try:
+                    st.info("⚡ Rendering with FFmpeg/libass backend...")
+                    return self._create_ffmpeg_video(
+                        media_files if mode != 'text_only' else [], audio_path, duration, video_format,
+                        final_subtitle_text, font_size, text_color, text_position,
+                        background_music, music_volume, text_effect
+                    )
+                except Exception as e:
+                    st.warning(f"⚠️ FFmpeg backend failed, falling back to MoviePy: {str(e)}")
+
             if mode == 'text_only':
                 st.info("🎬 Creating TEXT-ONLY karaoke video...")
                 return self._create_text_only_video(
@@ -72,106 +241,309 @@ class VideoEditor:
             import traceback
             st.error(f"Detailed error: {traceback.format_exc()}")
             return self._create_fallback_video(media_files, audio_path, duration, video_format)
+        finally:
+            self.job_report['quality'] = {
+                'quality': self.quality,
+                'frame_size': 'x'.join(str(v) for v in get_frame_size(video_format, self.quality)),
+                'total_time': round(time.perf_counter() - started, 3),
+            }
+
+    def create_variants(self, media_files, variants, duration, video_format='short',
+                        font_size=60, text_color='white', text_position='middle',
+                        background_music=None, music_volume=0.3, mode='video',
+                        text_effect='none', encode_profile=DEFAULT_ENCODE_PROFILE, quality='final'):
+        """Render several (subtitle_text, audio_path) variants over the same media
+
+        One ffmpeg graph decodes and scales the media once and splits the frames to an
+        overlay/audio/encoder branch per variant; each variant's karaoke is a cached
+        subtitle overlay. Returns the output paths in order.
+        """
+        started = time.perf_counter()
+        media_files = media_files if mode != 'text_only' else []
+        temp_files = []
+        try:
+            job_font_size, job_music = self._configure_job(
+                media_files, video_format, font_size, background_music,
+                1, self.segment_seconds, 0.0, encode_profile, quality, False
+            )
+            width, height = get_frame_size(video_format, self.quality)
+            fps = self._output_fps(STANDARD_FPS if media_files else TEXT_ONLY_FPS)
+            media = self._ffmpeg_media(media_files, temp_files)
+
+            overlay_start = time.perf_counter()
+            branches = []
+            for subtitle_text, audio_path in variants:
+                variant_duration = min(get_duration(audio_path), duration) if audio_path else duration
+                overlay = self.render_subtitle_overlay(
+                    subtitle_text, variant_duration, width, height, fps, job_font_size,
+                    text_color, text_position, text_effect
+                ) if subtitle_text else None
+                prefix = 'video' if media_files else 'text_karaoke'
+                output_path = os.path.join(self.temp_dir, sanitize_filename(f"{prefix}_{uuid.uuid4().hex[:8]}.mp4"))
+                branches.append((output_path, variant_duration, overlay, audio_path))
+            overlay_time = time.perf_counter() - overlay_start
+
+            st.info(f"🔀 Decoding the media once for {len(branches)} variant encodes...")
+            fan_out_start = time.perf_counter()
+            outputs = ffmpeg_renderer.render_variants(
+                branches, width, height, fps, max(branch[1] for branch in branches), media=media,
+                video_args=ffmpeg_video_args(self.encode_profile, fps, 'video' if media_files else 'text_only'),
+                background_music=job_music, music_volume=music_volume
+            )
+            fan_out_time = time.perf_counter() - fan_out_start
+        except Exception as e:
+            st.warning(f"⚠️ Shared-decode render failed, rendering variants one by one: {str(e)}")
+            return [
+                self.create_video(
+                    media_files, audio_path, duration, video_format, subtitle_text, font_size, text_color,
+                    text_position, background_music=background_music, music_volume=music_volume, mode=mode,
+                    text_effect=text_effect, encode_profile=encode_profile, quality=quality
+                )
+                for subtitle_text, audio_path in variants
+            ]
+        finally:
+            self._cleanup_clips([], temp_files)
+
+        elapsed = time.perf_counter() - started
+        self.job_report['variants'] = {
+            'count': len(outputs),
+            'overlay_time': round(overlay_time, 3),
+            'fan_out_time': round(fan_out_time, 3),
+            'render_time': round(elapsed, 3),
+            'overlays': [overlay.report() if overlay else None for _, _, overlay, _ in branches],
+        }
+        st.success(f"✅ {len(outputs)} variants created in {elapsed:.1f}s")
+        return outputs
+
+    def create_renditions(self, media_files, audio_path, duration, renditions=DEFAULT_RENDITIONS,
+                          subtitle_text="", font_size=60, text_color='white', text_position='middle',
+                          background_music=None, music_volume=0.3, mode='video', text_effect='none',
+                          encode_profile=DEFAULT_ENCODE_PROFILE, quality='final'):
+        """Render one job at several aspect ratios / resolutions (names from RENDITIONS)
+
+        Each source is decoded once and split per rendition; the karaoke is laid out per
+        rendition, timings are computed once, and the mixed audio is encoded once and
+        stream-copied into every output. Returns {rendition name: output path}.
+        """
+        started = time.perf_counter()
+        media_files = media_files if mode != 'text_only' else []
+        temp_files = []
+        try:
+            job_font_size, job_music = self._configure_job(
+                media_files, 'short', font_size, background_music,
+                1, self.segment_seconds, 0.0, encode_profile, quality, False
+            )
+            fps = self._output_fps(STANDARD_FPS if media_files else TEXT_ONLY_FPS)
+            actual_duration = min(get_duration(audio_path), duration) if audio_path else duration
+            media = self._ffmpeg_media(media_files, temp_files)
+            video_mode = 'video' if media_files else 'text_only'
+
+            audio_start = time.perf_counter()
+            mixed_audio = None
+            sources = [path if path and os.path.exists(path) else None for path in (audio_path, job_music)]
+            if any(sources):
+                key = audio_track_cache.key(
+                    sources, 'ffmpeg_mix', round(actual_duration, 3), music_volume if sources[1] else None
+                )
+                mixed_audio = audio_track_cache.get(key) or audio_track_cache.store(
+                    key, lambda output_path: ffmpeg_renderer.encode_audio(
+                        output_path, actual_duration, audio_path, job_music, music_volume
+                    )
+                )
+            audio_time = time.perf_counter() - audio_start
+
+            overlay_start = time.perf_counter()
+            timings = text_processor.create_punctuation_aware_karaoke(subtitle_text, actual_duration) if subtitle_text else []
+            # Font size is given for the 1080px short side of the default formats
+            reference_side = min(get_frame_size('short'))
+            outputs = []
+            for name in renditions:
+                width, height = get_rendition_size(name, self.quality)
+                overlay = self.render_subtitle_overlay(
+                    subtitle_text, actual_duration, width, height, fps,
+                    max(8, int(round(job_font_size * min(RENDITIONS[name]) / reference_side))),
+                    text_color, text_position, text_effect, timings=timings
+                ) if timings else None
+                output_path = os.path.join(self.temp_dir, sanitize_filename(
+                    f"video_{name.replace(':', 'x')}_{uuid.uuid4().hex[:8]}.mp4"
+                ))
+                outputs.append((output_path, width, height, overlay, ffmpeg_video_args(
+                    self.encode_profile, fps, video_mode, frame_size=(width, height)
+                )))
+            overlay_time = time.perf_counter() - overlay_start
+
+            st.info(f"📐 Encoding {len(outputs)} renditions from one decode of the media...")
+            encode_start = time.perf_counter()
+            ffmpeg_renderer.render_renditions(outputs, fps, actual_duration, media=media, audio_path=mixed_audio)
+            encode_time = time.perf_counter() - encode_start
+        except Exception as e:
+            st.warning(f"⚠️ Multi-rendition render failed, rendering the 9:16 video only: {str(e)}")
+            return {'9:16': self.create_video(
+                media_files, audio_path, duration, 'short', subtitle_text, font_size, text_color,
+                text_position, background_music=background_music, music_volume=music_volume, mode=mode,
+                text_effect=text_effect, encode_profile=encode_profile, quality=quality
+            )}
+        finally:
+            self._cleanup_clips([], temp_files)
+
+        elapsed = time.perf_counter() - started
+        self.job_report['renditions'] = {
+            'renditions': {
+                name: {'size': f"{width}x{height}", 'overlay': overlay.report() if overlay else None}
+                for name, (_, width, height, overlay, _) in zip(renditions, outputs)
+            },
+            'audio_time': round(audio_time, 3),
+            'overlay_time': round(overlay_time, 3),
+            'encode_time': round(encode_time, 3),
+            'render_time': round(elapsed, 3),
+        }
+        st.success(f"✅ {len(outputs)} renditions created in {elapsed:.1f}s")
+        return {name: rendition[0] for name, rendition in zip(renditions, outputs)}
+
+    def _fit_size_limit(self, size_limit, media_files, audio_path, duration, video_format, render_backend='moviepy',
+                        subtitle_text='', subtitle_style=None):
+        """Rate-control the job's encode profile so the output lands under a platform or MB limit
+
+        subtitle_style: (font_size, text_color, text_position, text_effect) of the burned-in karaoke
+        """
+        temp_files = []
+        try:
+            max_mb, max_kbps, label = resolve_limit(size_limit)
+            actual_duration = min(get_duration(audio_path), duration) if audio_path else duration
+            width, height = get_frame_size(video_format, self.quality)
+            fps = self._output_fps(STANDARD_FPS if media_files else TEXT_ONLY_FPS)
+            # Stitched segments (MoviePy backend) each start with a full VBV buffer
+            segmented = (render_backend != 'ffmpeg' and (self.workers > 1 or self.segment_cache)
+                         and not (self.preview_callback or self.hls_dir))
+            buffers = math.ceil(actual_duration / self.segment_seconds) if segmented else 1
+            budget = video_budget_kbps(max_mb, actual_duration, max_kbps, buffers)
+
+            st.info(f"🎯 Analysing a proxy to fit {label}...")
+            started = time.perf_counter()
+            subtitle_path = fonts_dir = None
+            if subtitle_text and subtitle_style:
+                font_size, text_color, text_position, text_effect = subtitle_style
+                subtitle_path, fonts_dir = self._write_ass_subtitles(
+                    subtitle_text, actual_duration, *proxy_size(width, height),
+                    max(4, int(round(font_size * PROXY_SCALE))), text_color, text_position, text_effect, temp_files
+                )
+            estimate = estimate_bitrate(
+                self._ffmpeg_media(media_files, temp_files), width, height, fps, actual_duration,
+                subtitle_path, fonts_dir
+            )
+            self.encode_profile, report = fit_profile(self.encode_profile, budget, estimate)
+            # The fitted copy is what the encoders use from here on
+            self.job_report['encode_profile'] = self.encode_profile
+            self.job_report['size_target'] = dict(
+                report, limit=label, max_mb=max_mb, subtitles_in_analysis=subtitle_path is not None,
+                analysis_time=round(time.perf_counter() - started, 3)
+            )
+            st.info(f"🎯 Video capped at {budget} kbps, CRF {report['crf']}")
+        except Exception as e:
+            st.warning(f"⚠️ Could not fit the size limit, using the profile as is: {str(e)}")
+        finally:
+            self._cleanup_clips([], temp_files)
+
+    def _fit_quality_target(self, spec, fps):
+        """Switch the job's encode profile to the cheapest CRF that keeps the quality floor on spec"""
+        clips = []
+        try:
+            if self.quality_target in QUALITY_TARGETS:
+                min_ssim = QUALITY_TARGETS[self.quality_target]['ssim']
+            else:
+                min_ssim = float(self.quality_target)
+            st.info(f"🔬 Trial-encoding sampled windows for SSIM ≥ {min_ssim:g}...")
+            # The overlay's karaoke, drawn in: the sampled frames look like the final output
+            final_clip, clips = self.build_video_clip(dict(spec, overlay=None))
+            clips.append(final_clip)
+            self.encode_profile, report = choose_crf(
+                final_clip, self.encode_profile, fps, spec['duration'], spec['mode'], min_ssim
+            )
+            self.job_report['quality_target'] = report
+            self.job_report['encode_profile'] = self.encode_profile
+            if report['met']:
+                st.info(
+                    f"🔬 CRF {report['crf']} (SSIM {report['ssim']:.3f}, PSNR {report['psnr']:.1f} dB) "
+                    f"in {report['analysis_time']:.1f}s"
+                )
+            else:
+                st.warning(
+                    f"⚠️ Quality target not reached: SSIM {report['ssim']:.3f} < {min_ssim:g} "
+                    f"even at CRF {report['crf']}"
+                )
+        except Exception as e:
+            st.warning(f"⚠️ Could not fit the quality target, using the profile as is: {str(e)}")
+        finally:
+            self._cleanup_clips(clips, [])
+        # One analysis per job
+        self.quality_target = None
+
+    def check_size_target(self, output_path):
+        """Record the output size against the job's size limit; False (with a warning) when it does not fit"""
+        target = self.job_report.get('size_target')
+        if not target or not output_path or not os.path.exists(output_path):
+            return True
+        size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        target['output_mb'] = round(size_mb, 2)
+        target['fits'] = size_mb <= target['max_mb']
+        if not target['fits']:
+            st.warning(f"⚠️ Output is {size_mb:.1f} MB, over the {target['limit']} limit")
+        return target['fits']
+
+    def _configure_job(self, media_files, video_format, font_size, background_music,
+                       workers, segment_seconds, loop_crossfade, encode_profile, quality, segment_cache,
+                       preview_callback=None, hls_dir=None):
+        """Reset per-job state; returns font_size and background_music adjusted for the quality"""
+        # Fresh word atlas and report for every job
+        self.word_atlas.reset()
+        self.job_report = {}
+        self.workers = max(1, int(workers))
+        self.segment_seconds = max(1.0, float(segment_seconds))
+        self.loop_crossfade = max(0.0, float(loop_crossfade))
+        self.encode_profile = encode_profile
+        self.quality = quality
+        self.segment_cache = segment_cache
+        self.preview_callback = preview_callback
+        self.hls_dir = hls_dir
+        self.quality_target = None
+
+        if quality == 'draft':
+            st.info("📝 Draft render: reduced resolution and frame rate, no background music")
+            self.encode_profile = DRAFT_ENCODE_PROFILE
+            self.workers = 1
+            font_size = max(8, int(round(font_size * DRAFT_SCALE)))
+            background_music = None
+            # Warm the full-size mezzanines so the final render finds them ready
+            if media_files:
+                media_ingest.prefetch(media_files, *get_frame_size(video_format), STANDARD_FPS)
+        self.job_report['encode_profile'] = self.encode_profile
+        return font_size, background_music
 
     def _create_text_only_video(self, audio_path, duration, video_format, subtitle_text,
                                font_size, text_color, text_position, background_music, music_volume,
-                               text_effect='none'):
-        """Create text-only karaoke video with effects"""
+                               text_effect='none', overlay=None):
+        """Create text-only karaoke video with effects (overlay: see build_video_clip)"""
         try:
             # Video settings
-            if video_format == 'short':
-                width, height = 1080, 1920  # 9:16
-            else:
-                width, height = 1920, 1080  # 16:9
-
-            # Get effect config
-            effect_config = get_text_effect_config(text_effect)
-
-            # Get actual audio duration
-            audio_duration = 0
-            if audio_path and os.path.exists(audio_path):
-                try:
-                    audio_clip_test = AudioFileClip(audio_path)
-                    audio_duration = audio_clip_test.duration
-                    audio_clip_test.close()
-                    st.info(f"🎵 Audio duration: {audio_duration:.1f}s / Target: {duration}s")
-                except Exception as e:
-                    st.warning(f"⚠️ Could not read audio duration: {str(e)}")
-                    audio_duration = duration
+            width, height = get_frame_size(video_format, self.quality)
 
             # Use the shorter duration between audio and target
-            actual_duration = min(audio_duration, duration) if audio_duration > 0 else duration
-
-            # Create solid color background
-            background = ColorClip(size=(width, height), color=(0, 0, 0))
-            background = background.set_duration(actual_duration)
-
-            final_clip = background
-
-            # Add audio if available
-            if audio_path and os.path.exists(audio_path):
-                try:
-                    audio_clip = AudioFileClip(audio_path)
-
-                    # Match audio duration to video duration
-                    if audio_clip.duration > actual_duration:
-                        audio_clip = audio_clip.subclip(0, actual_duration)
-                        st.info("✂️ Audio trimmed to match video duration")
-                    elif audio_clip.duration < actual_duration:
-                        audio_clip = self._loop_audio(audio_clip, actual_duration)
-                        st.info("🔁 Audio looped to match video duration")
-
-                    final_clip = final_clip.set_audio(audio_clip)
-                    st.success("✅ Audio synchronized with text video")
-
-                except Exception as e:
-                    st.warning(f"⚠️ Could not add audio: {str(e)}")
-
-            # Add punctuation-aware karaoke subtitles with effects
-            if subtitle_text:
-                try:
-                    final_clip = self._add_punctuation_aware_karaoke(
-                        final_clip, subtitle_text, font_size, text_color,
-                        text_position, actual_duration, text_effect
-                    )
-                    st.success(f"✅ {effect_config['name']} karaoke added to text-only video!")
-                except Exception as e:
-                    st.warning(f"⚠️ Could not add karaoke: {str(e)}")
-                    final_clip = self._add_normal_subtitle(final_clip, subtitle_text, font_size, text_color, text_position, text_effect)
+            actual_duration = self._sync_duration(audio_path, duration)
 
-            # Add background music
-            if background_music and os.path.exists(background_music):
-                try:
-                    bg_music_clip = AudioFileClip(background_music).volumex(music_volume)
-                    bg_music_clip = bg_music_clip.subclip(0, actual_duration)
-
-                    if final_clip.audio:
-                        final_audio = CompositeAudioClip([final_clip.audio, bg_music_clip])
-                        final_clip = final_clip.set_audio(final_audio)
-                    else:
-                        final_clip = final_clip.set_audio(bg_music_clip)
-                    st.success("✅ Background music added")
-                except Exception as e:
-                    st.warning(f"⚠️ Could not add background music: {str(e)}")
+            spec = {
+                'mode': 'text_only', 'media': [], 'width': width, 'height': height,
+                'duration': actual_duration, 'subtitle_text': subtitle_text, 'font_size': font_size,
+                'text_color': text_color, 'text_position': text_position, 'text_effect': text_effect,
+                'overlay': overlay
+            }
+            audio_file = self._audio_track(audio_path, background_music, music_volume, actual_duration)
 
             # Export video
             output_filename = f"text_karaoke_{uuid.uuid4().hex[:8]}.mp4"
             output_path = os.path.join(self.temp_dir, sanitize_filename(output_filename))
 
             st.info("📤 Exporting text-only karaoke video...")
-
-            final_clip.write_videofile(
-                output_path,
-                codec='libx264',
-                audio_codec='aac',
-                verbose=False,
-                logger=None,
-                fps=24,
-                bitrate="1500k",
-                threads=4
-            )
-
-            final_clip.close()
+            self._write_video(spec, audio_file, output_path, fps=self._output_fps(TEXT_ONLY_FPS))
 
             st.success(f"✅ Text-only karaoke video created: {os.path.basename(output_path)}")
             return output_path
@@ -182,160 +554,669 @@ class VideoEditor:
 
     def _create_standard_video(self, media_files, audio_path, duration, video_format,
                               subtitle_text, font_size, text_color, text_position,
-                              background_music, music_volume, text_effect='none'):
-        """Create standard video with media files"""
+                              background_music, music_volume, text_effect='none', overlay=None):
+        """Create standard video with media files (overlay: see build_video_clip)"""
         # Video settings
-        if video_format == 'short':
-            width, height = 1080, 1920
-        else:
-            width, height = 1920, 1080
+        width, height = get_frame_size(video_format, self.quality)
+        fps = self._output_fps(STANDARD_FPS)
 
-        clips = []
+        media = []
         temp_files = []
+        ingest_states = []
 
-        # Process each media file
+        # Use the pre-normalized mezzanine of each upload (target size and fps)
         for media_file in media_files:
             try:
-                # Save uploaded file temporarily
-                temp_path = os.path.join(self.temp_dir, f"temp_{uuid.uuid4().hex[:8]}_{media_file.name}")
-                with open(temp_path, 'wb') as f:
-                    f.write(media_file.getvalue())
-                temp_files.append(temp_path)
-
-                # Create clip based on file type
-                if media_file.type.startswith('video'):
-                    clip = VideoFileClip(temp_path)
-                    clip_duration = min(10, clip.duration)
-                    clip = clip.subclip(0, clip_duration)
-                else:
-                    clip = ImageClip(temp_path)
-                    clip_duration = 5
-                    clip = clip.set_duration(clip_duration)
-
-                # Resize to target dimensions
-                clip = clip.resize(newsize=(width, height))
-                clips.append(clip)
-
+                is_image = not media_file.type.startswith('video')
+                try:
+                    path, state = media_ingest.normalized_path(media_file, width, height, fps)
+                    ingest_states.append(state)
+                except Exception as e:
+                    st.warning(f"⚠️ Could not normalize {media_file.name}, using original: {str(e)}")
+                    path = os.path.join(self.temp_dir, f"temp_{uuid.uuid4().hex[:8]}_{media_file.name}")
+                    with open(path, 'wb') as f:
+                        f.write(media_file.getvalue())
+                    temp_files.append(path)
+                media.append((path, is_image, media_file.name))
             except Exception as e:
                 st.warning(f"⚠️ Skipped {media_file.name}: {str(e)}")
                 continue
 
-        if not clips:
+        if ingest_states:
+            self.job_report['media_ingest'] = {
+                state: ingest_states.count(state) for state in ('ready', 'pending', 'queued')
+            }
+
+        if not media:
             st.error("❌ No valid media files processed")
             return self._create_fallback_video(media_files, audio_path, duration, video_format)
 
-        # Create final video clip
-        if len(clips) == 1:
-            final_clip = clips[0]
-        else:
-            final_clip = concatenate_videoclips(clips, method="compose")
+        # Adjust video duration based on audio
+        actual_duration = self._sync_duration(audio_path, duration)
+        st.info(f"📊 Using synchronized duration: {actual_duration:.1f}s")
+
+        # Stills only: the concat-demuxer engine needs no per-frame compositing
+        if all(is_image for _, is_image, _ in media):
+            try:
+                output_path = self._create_slideshow_video(
+                    [(path, IMAGE_CLIP_SECONDS) for path, _, _ in media], audio_path, actual_duration,
+                    width, height, fps, '' if overlay else subtitle_text, font_size, text_color, text_position,
+                    background_music, music_volume, text_effect, overlay=overlay
+                )
+                self._cleanup_clips([], temp_files)
+                return output_path
+            except Exception as e:
+                st.warning(f"⚠️ Slideshow engine failed, using MoviePy: {str(e)}")
+
+        spec = {
+            'mode': 'video', 'media': media, 'width': width, 'height': height,
+            'duration': actual_duration, 'subtitle_text': subtitle_text, 'font_size': font_size,
+            'text_color': text_color, 'text_position': text_position, 'text_effect': text_effect,
+            'overlay': overlay
+        }
+        # Export video
+        output_filename = f"video_{uuid.uuid4().hex[:8]}.mp4"
+        output_path = os.path.join(self.temp_dir, sanitize_filename(output_filename))
+
+        try:
+            audio_file = self._audio_track(audio_path, background_music, music_volume, actual_duration)
+            st.info("📤 Exporting synchronized video...")
+            self._write_video(spec, audio_file, output_path, fps=fps)
+        finally:
+            self._cleanup_clips([], temp_files)
 
-        # Get actual audio duration
+        st.success(f"✅ Synchronized video created: {os.path.basename(output_path)}")
+        return output_path
+
+    def _output_fps(self, final_fps):
+        """Frame rate for the current job quality"""
+        return min(DRAFT_FPS, final_fps) if self.quality == 'draft' else final_fps
+
+    def _sync_duration(self, audio_path, duration):
+        """Shorter of narration length and target duration"""
         audio_duration = 0
         if audio_path and os.path.exists(audio_path):
             try:
                 audio_clip_test = AudioFileClip(audio_path)
                 audio_duration = audio_clip_test.duration
                 audio_clip_test.close()
-                st.info(f"🎵 Audio duration: {audio_duration:.1f}s / Video target: {duration}s")
+                st.info(f"🎵 Audio duration: {audio_duration:.1f}s / Target: {duration}s")
             except Exception as e:
                 st.warning(f"⚠️ Could not read audio duration: {str(e)}")
                 audio_duration = duration
+        return min(audio_duration, duration) if audio_duration > 0 else duration
 
-        # Adjust video duration based on audio
-        if audio_duration > 0:
-            actual_duration = min(audio_duration, duration)
+    def build_video_clip(self, spec):
+        """Build the video-only timeline (media or black background + karaoke) described by a render spec
 
-            if final_clip.duration > actual_duration:
-                final_clip = final_clip.subclip(0, actual_duration)
-            elif final_clip.duration < actual_duration:
-                final_clip = self._loop_clip(final_clip, actual_duration)
+        The spec holds only paths and plain values so worker processes can rebuild
+        the same timeline. With spec['overlay'] (a SubtitleOverlay) the karaoke is left to
+        the encoder, which lays the overlay over the frames. Returns (final_clip, source_clips).
+        """
+        width, height = spec['width'], spec['height']
+        duration = spec['duration']
+        clips = []
 
-            st.info(f"📊 Using synchronized duration: {actual_duration:.1f}s")
+        if spec['mode'] == 'text_only':
+            # uint8 color so frames reach the encoder without a dtype conversion
+            final_clip = ColorClip(size=(width, height), color=np.zeros(3, dtype='uint8')).set_duration(duration)
         else:
+            for path, is_image, name in spec['media']:
+                try:
+                    # Create clip based on file type
+                    if is_image:
+                        clip = ImageClip(path).set_duration(IMAGE_CLIP_SECONDS)
+                    else:
+                        clip = VideoFileClip(path)
+                        clip = clip.subclip(0, min(MAX_CLIP_SECONDS, clip.duration))
+
+                    # Resize to target dimensions (normalized media already match)
+                    if tuple(clip.size) != (width, height):
+                        clip = clip.resize(newsize=(width, height))
+                    clips.append(clip)
+                except Exception as e:
+                    st.warning(f"⚠️ Skipped {name}: {str(e)}")
+                    continue
+
+            if not clips:
+                raise ValueError("No valid media files processed")
+
+            if len(clips) == 1:
+                final_clip = clips[0]
+            else:
+                # Every clip already has the target size: chaining needs no per-frame canvas
+                final_clip = concatenate_videoclips(clips, method="chain")
+
             if final_clip.duration > duration:
                 final_clip = final_clip.subclip(0, duration)
             elif final_clip.duration < duration:
                 final_clip = self._loop_clip(final_clip, duration)
 
-        # Add audio if available
-        final_audio_duration = final_clip.duration
+        # Add punctuation-aware karaoke subtitles with effects
+        subtitle_text = spec.get('subtitle_text')
+        if subtitle_text and not spec.get('overlay'):
+            args = (subtitle_text, spec['font_size'], spec['text_color'], spec['text_position'])
+            try:
+                final_clip = self._add_punctuation_aware_karaoke(
+                    final_clip, *args, duration, spec['text_effect']
+                )
+                st.success("✅ Punctuation-aware karaoke added!")
+            except Exception as e:
+                st.warning(f"⚠️ Could not add karaoke: {str(e)}")
+                final_clip = self._add_normal_subtitle(final_clip, *args, spec['text_effect'])
+
+        return final_clip, clips
+
+    def _unchanged_soundtrack(self, audio_path, background_music, duration):
+        """True when audio_path goes into the output as-is, by stream copy
+
+        That is the case for the uploaded video's own audio with auto-subtitles: an AAC
+        stream, no music to mix in and no looping to reach the duration.
+        """
+        return bool(
+            audio_path and os.path.exists(audio_path)
+            and not (background_music and os.path.exists(background_music))
+            and can_stream_copy_audio(audio_path) and get_duration(audio_path) + 0.05 >= duration
+        )
+
+    def _audio_track(self, audio_path, background_music, music_volume, duration):
+        """Narration/music mix (see _build_audio_track) as AAC, encoded once and cached by its inputs
+
+        Returns the path of the cached track, or None when there is no audio.
+        """
+        sources = [path if path and os.path.exists(path) else None for path in (audio_path, background_music)]
+        if not any(sources):
+            return None
+
+        copy = self._unchanged_soundtrack(audio_path, background_music, duration)
+        if copy:
+            key = audio_track_cache.key(sources, 'copy', round(duration, 3))
+        else:
+            key = audio_track_cache.key(
+                sources, 'mix', round(duration, 3), music_volume if sources[1] else None, self.loop_crossfade
+            )
+        cached = audio_track_cache.get(key)
+        self.job_report['audio_track'] = {'source': 'stream copy' if copy else 'mix', 'cached': bool(cached)}
+        if cached:
+            st.info("🎵 Reusing the encoded audio track")
+            return cached
+
+        if copy:
+            st.info("🎵 Keeping the original audio stream (stream copy)")
+            return audio_track_cache.store(key, lambda output_path: run_ffmpeg(
+                ['-i', audio_path, '-map', '0:a:0', '-c:a', 'copy', '-t', f"{duration:.3f}", '-vn', output_path]
+            ))
+
+        audio = self._build_audio_track(audio_path, background_music, music_volume, duration)
+        if audio is None:
+            return None
+        try:
+            return audio_track_cache.store_clip(key, audio)
+        finally:
+            self._cleanup_clips([audio], [])
+
+    def _soundtrack(self, spec):
+        """The uploads' own sound along the timeline as cached AAC, or None when they are silent"""
+        key = audio_track_cache.key(
+            [path for path, _, _ in spec['media']], 'soundtrack',
+            [(is_image, name) for _, is_image, name in spec['media']], round(spec['duration'], 3), self.loop_crossfade
+        )
+        cached = audio_track_cache.get(key)
+        if cached:
+            return cached
+
+        base_clip, clips = self.build_video_clip(dict(spec, subtitle_text=''))
+        try:
+            if base_clip.audio is None:
+                return None
+            return audio_track_cache.store_clip(key, base_clip.audio)
+        finally:
+            self._cleanup_clips(clips + [base_clip], [])
+
+    def _build_audio_track(self, audio_path, background_music, music_volume, duration):
+        """Narration trimmed/looped to duration, mixed with background music"""
+        final_audio = None
+
         if audio_path and os.path.exists(audio_path):
             try:
                 audio_clip = AudioFileClip(audio_path)
 
-                if audio_clip.duration > final_audio_duration:
-                    audio_clip = audio_clip.subclip(0, final_audio_duration)
+                # Match audio duration to video duration
+                if audio_clip.duration > duration:
+                    audio_clip = audio_clip.subclip(0, duration)
                     st.info("✂️ Audio trimmed to match video duration")
-                elif audio_clip.duration < final_audio_duration:
-                    audio_clip = self._loop_audio(audio_clip, final_audio_duration)
+                elif audio_clip.duration < duration:
+                    audio_clip = self._loop_audio(audio_clip, duration)
                     st.info("🔁 Audio looped to match video duration")
 
-                final_clip = final_clip.set_audio(audio_clip)
+                final_audio = audio_clip
                 st.success("✅ Audio synchronized with video")
 
             except Exception as e:
                 st.warning(f"⚠️ Could not add audio: {str(e)}")
-                final_audio_duration = final_clip.duration
-        else:
-            final_audio_duration = final_clip.duration
-
-        # Add punctuation-aware karaoke subtitles
-        if subtitle_text:
-            try:
-                final_clip = self._add_punctuation_aware_karaoke(
-                    final_clip, subtitle_text, font_size, text_color,
-                    text_position, final_audio_duration, text_effect
-                )
-                st.success("✅ Punctuation-aware karaoke added!")
-            except Exception as e:
-                st.warning(f"⚠️ Could not add karaoke: {str(e)}")
-                final_clip = self._add_normal_subtitle(final_clip, subtitle_text, font_size, text_color, text_position, text_effect)
 
         # Add background music
         if background_music and os.path.exists(background_music):
             try:
                 bg_music_clip = AudioFileClip(background_music).volumex(music_volume)
-                bg_music_clip = bg_music_clip.subclip(0, final_audio_duration)
+                bg_music_clip = bg_music_clip.subclip(0, duration)
 
-                if final_clip.audio:
-                    final_audio = CompositeAudioClip([final_clip.audio, bg_music_clip])
-                    final_clip = final_clip.set_audio(final_audio)
+                if final_audio:
+                    final_audio = CompositeAudioClip([final_audio, bg_music_clip])
                 else:
-                    final_clip = final_clip.set_audio(bg_music_clip)
+                    final_audio = bg_music_clip
                 st.success("✅ Background music added")
             except Exception as e:
                 st.warning(f"⚠️ Could not add background music: {str(e)}")
 
-        # Export video
-        output_filename = f"video_{uuid.uuid4().hex[:8]}.mp4"
-        output_path = os.path.join(self.temp_dir, sanitize_filename(output_filename))
+        return final_audio
+
+    def segment_inputs(self, spec):
+        """Callable (start, end) -> everything that affects that time range of the spec's video track"""
+        # One loop period of the media timeline as (start, end, content digest)
+        layout = []
+        if spec['mode'] != 'text_only':
+            position = 0.0
+            for path, is_image, name in spec['media']:
+                length = IMAGE_CLIP_SECONDS if is_image else min(MAX_CLIP_SECONDS, get_duration(path))
+                layout.append((position, position + length, hash_file(path)))
+                position += length
+        period = layout[-1][1] if layout else 0.0
+
+        timings = []
+        if spec.get('subtitle_text'):
+            timings = text_processor.create_punctuation_aware_karaoke(spec['subtitle_text'], spec['duration'])
+
+        style = (spec['mode'], spec['width'], spec['height'], spec['font_size'],
+                 spec['text_color'], spec['text_position'], spec['text_effect'],
+                 self.word_atlas.font_name, COMPOSITOR_VERSION,
+                 os.path.basename(spec['overlay'].path) if spec.get('overlay') else None)
+
+        def inputs(start, end):
+            pieces = []
+            if period:
+                for loop in range(int(start // period), int(end // period) + 1):
+                    offset = loop * period
+                    for a, b, digest in layout:
+                        if a + offset < end and b + offset > start:
+                            local_start = max(a + offset, start) - offset - a
+                            local_end = min(b + offset, end) - offset - a
+                            placed = max(a + offset, start) - start
+                            pieces.append((digest, round(local_start, 3), round(local_end, 3), round(placed, 3)))
+            words = [
+                (t['text'], t['punctuation'], round(t['start_time'], 3), round(t['end_time'], 3))
+                for t in timings if t['start_time'] < end and t['end_time'] > start
+            ]
+            return repr((style, pieces, words))
+
+        return inputs
+
+    def _write_video(self, spec, audio_file, output_path, fps):
+        """Encode the timeline, in cached segments and/or across worker processes when enabled
+
+        audio_file (see _audio_track) is muxed by stream copy; without it the uploads' own
+        soundtrack is used.
+        """
+        # Segments only exist once stitched: a progressive job encodes in one pass
+        progressive = self.preview_callback is not None or bool(self.hls_dir)
+        if self.quality_target:
+            self._fit_quality_target(spec, fps)
+        if audio_file is None and spec['mode'] != 'text_only':
+            # No narration or music: keep the uploads' own soundtrack
+            try:
+                audio_file = self._soundtrack(spec)
+            except Exception as e:
+                st.warning(f"⚠️ Could not keep the original sound: {str(e)}")
+        if not progressive and (self.workers > 1 or self.segment_cache) and spec['duration'] > self.segment_seconds:
+            try:
+                report = parallel_renderer.render(
+                    spec, audio_file, output_path, fps, self.workers, self.segment_seconds,
+                    ffmpeg_video_args(self.encode_profile, fps, spec['mode']),
+                    segment_inputs=self.segment_inputs(spec) if self.segment_cache else None,
+                    build_clip=self.build_video_clip,
+                    trace_allocations=self.trace_allocations
+                )
+                self.job_report['segment_render'] = report
+                st.info(
+                    f"⚡ {report['segments']} segments ({report['cache_hits']} cached) on "
+                    f"{report['workers']} workers: {report['wall_time']:.1f}s"
+                )
+                return output_path
+            except Exception as e:
+                st.warning(f"⚠️ Segmented render failed, rendering in one pass: {str(e)}")
+
+        final_clip, clips = self.build_video_clip(spec)
+        partial_path = f"{os.path.splitext(output_path)[0]}_fragments.mp4"
+        try:
+            preview = None
+            if progressive:
+                output_args, target = fragmented_output(partial_path, self.hls_dir)
+                if self.preview_callback:
+                    preview = ProgressivePreview(partial_path, fps, self.preview_callback)
+            else:
+                output_args, target = ['-movflags', '+faststart'], output_path
+            report = frame_pipeline.write(
+                final_clip, target, fps, ffmpeg_video_args(self.encode_profile, fps, spec['mode']) + output_args,
+                audio_path=audio_file, trace_allocations=self.trace_allocations, progress=preview,
+                overlay=spec.get('overlay')
+            )
+            if progressive:
+                finalize(partial_path, output_path)
+                self.job_report['progressive'] = {
+                    'preview_updates': preview.updates if preview else 0,
+                    'hls_playlist': os.path.join(self.hls_dir, 'index.m3u8') if self.hls_dir else None,
+                }
+            self.job_report['frame_pipeline'] = report
+            st.info(
+                f"🧵 Frame pipeline: {report['frames']} frames in {report['wall_time']:.1f}s "
+                f"(bottleneck: {report['bottleneck']})"
+            )
+        except Exception as e:
+            st.warning(f"⚠️ Frame pipeline failed, using MoviePy writer: {str(e)}")
+            if spec.get('overlay'):
+                # The writer takes no second video input: draw the karaoke into the frames instead
+                self._cleanup_clips(clips + [final_clip], [])
+                final_clip, clips = self.build_video_clip(dict(spec, overlay=None))
+            # A path as audio is muxed with -acodec copy: no temp audio file in the working directory
+            final_clip.write_videofile(
+                output_path,
+                audio=audio_file or False,
+                verbose=False,
+                logger=None,
+                fps=fps,
+                **moviepy_write_kwargs(self.encode_profile, fps, spec['mode'])
+            )
+        finally:
+            self._cleanup_clips(clips + [final_clip], [partial_path])
+        return output_path
+
+    def _create_ffmpeg_video(self, media_files, audio_path, duration, video_format,
+                             subtitle_text, font_size, text_color, text_position,
+                             background_music, music_volume, text_effect='none', overlay=None):
+        """Render with one ffmpeg filtergraph: scale/pad media (or black color source), ass subtitles
+        or a SubtitleOverlay, amix music"""
+        start = time.perf_counter()
+        width, height = get_frame_size(video_format, self.quality)
+        fps = self._output_fps(STANDARD_FPS if media_files else TEXT_ONLY_FPS)
 
-        st.info("📤 Exporting synchronized video...")
-
-        final_clip.write_videofile(
-            output_path,
-            codec='libx264',
-            audio_codec='aac',
-            verbose=False,
-            logger=None,
-            fps=15,
-            bitrate="1500k",
-            threads=4
+        # Same duration rule as the MoviePy paths: the shorter of narration and target
+        audio_duration = 0
+        if audio_path and os.path.exists(audio_path):
+            audio_duration = get_duration(audio_path)
+            st.info(f"🎵 Audio duration: {audio_duration:.1f}s / Target: {duration}s")
+        actual_duration = min(audio_duration, duration) if audio_duration > 0 else duration
+
+        temp_files = []
+        try:
+            media = self._ffmpeg_media(media_files, temp_files)
+            subtitle_path, fonts_dir = self._write_ass_subtitles(
+                subtitle_text, actual_duration, width, height, font_size, text_color, text_position,
+                text_effect, temp_files
+            )
+
+            prefix = 'video' if media_files else 'text_karaoke'
+            output_path = os.path.join(self.temp_dir, sanitize_filename(f"{prefix}_{uuid.uuid4().hex[:8]}.mp4"))
+
+            st.info("📤 Exporting with a single ffmpeg filtergraph...")
+            ffmpeg_renderer.render(
+                output_path, width, height, fps, actual_duration, media=media,
+                audio_path=audio_path, background_music=background_music, music_volume=music_volume,
+                subtitle_path=subtitle_path, fonts_dir=fonts_dir,
+                video_args=ffmpeg_video_args(self.encode_profile, fps, 'video' if media_files else 'text_only'),
+                audio_copy=self._unchanged_soundtrack(audio_path, background_music, actual_duration),
+                overlay=overlay
+            )
+        finally:
+            self._cleanup_clips([], temp_files)
+
+        elapsed = time.perf_counter() - start
+        self.job_report['render_backend'] = {'backend': 'ffmpeg', 'render_time': round(elapsed, 3)}
+        st.success(f"✅ FFmpeg render finished in {elapsed:.1f}s: {os.path.basename(output_path)}")
+        return output_path
+
+    def _ffmpeg_media(self, media_files, temp_files):
+        """Uploads written to temp files as ffmpeg timeline entries (path, is_image, clip_duration)"""
+        media = []
+        for media_file in media_files:
+            temp_path = os.path.join(self.temp_dir, f"temp_{uuid.uuid4().hex[:8]}_{media_file.name}")
+            with open(temp_path, 'wb') as f:
+                f.write(media_file.getvalue())
+            temp_files.append(temp_path)
+
+            if media_file.type.startswith('video'):
+                media.append((temp_path, False, min(10, get_duration(temp_path))))
+            else:
+                media.append((temp_path, True, 5))
+
+        if media_files and not media:
+            raise RuntimeError("No valid media files processed")
+        return media
+
+    def _create_slideshow_video(self, images, audio_path, duration, width, height, fps,
+                                subtitle_text, font_size, text_color, text_position,
+                                background_music, music_volume, text_effect='none', overlay=None):
+        """Render (path, seconds) stills with the ffmpeg concat-demuxer slideshow engine; no frame touches Python"""
+        start = time.perf_counter()
+        temp_files = []
+        try:
+            subtitle_path, fonts_dir = self._write_ass_subtitles(
+                subtitle_text, duration, width, height, font_size, text_color, text_position,
+                text_effect, temp_files
+            )
+            output_path = os.path.join(self.temp_dir, sanitize_filename(f"video_{uuid.uuid4().hex[:8]}.mp4"))
+            st.info(f"🖼️ Rendering {len(images)} images with the FFmpeg slideshow engine...")
+            ffmpeg_renderer.render_slideshow(
+                output_path, images, width, height, fps, duration,
+                audio_path=audio_path, background_music=background_music, music_volume=music_volume,
+                subtitle_path=subtitle_path, fonts_dir=fonts_dir,
+                video_args=ffmpeg_video_args(self.encode_profile, fps, 'slideshow'), overlay=overlay
+            )
+        finally:
+            self._cleanup_clips([], temp_files)
+
+        elapsed = time.perf_counter() - start
+        self.job_report['render_backend'] = {
+            'backend': 'ffmpeg-slideshow', 'images': len(images), 'render_time': round(elapsed, 3)
+        }
+        st.success(f"✅ Slideshow rendered in {elapsed:.1f}s: {os.path.basename(output_path)}")
+        return output_path
+
+    def _write_ass_subtitles(self, subtitle_text, duration, width, height, font_size, text_color,
+                             text_position, text_effect, temp_files):
+        """Karaoke as an ASS file for libass; returns (subtitle_path, fonts_dir), (None, None) without text"""
+        if not subtitle_text:
+            return None, None
+        timings = text_processor.create_punctuation_aware_karaoke(subtitle_text, duration)
+        script = build_ass_script(
+            timings, width, height, font_size, text_color, text_position,
+            get_text_effect_config(text_effect), text_effect
         )
+        subtitle_path = os.path.join(self.temp_dir, f"karaoke_{uuid.uuid4().hex[:8]}.ass")
+        with open(subtitle_path, 'w', encoding='utf-8') as f:
+            f.write(script)
+        temp_files.append(subtitle_path)
+        _, fonts_dir = resolve_font_family('Arial-Bold', font_size)
+        return subtitle_path, fonts_dir
+
+    def _create_soft_subtitle_video(self, media_files, audio_path, duration, video_format,
+                                    subtitle_text, font_size, text_color, text_position,
+                                    background_music, music_volume, text_effect='none',
+                                    subtitle_language='id', render_backend='moviepy'):
+        """Mux karaoke timings as a mov_text track instead of burning them into every frame"""
+        start = time.perf_counter()
 
-        # Cleanup
-        self._cleanup_clips(clips + [final_clip], temp_files)
+        audio_duration = 0
+        if audio_path and os.path.exists(audio_path):
+            audio_duration = get_duration(audio_path)
+        actual_duration = min(audio_duration, duration) if audio_duration > 0 else duration
 
-        st.success(f"✅ Synchronized video created: {os.path.basename(output_path)}")
+        temp_files = []
+        try:
+            source_path = None
+            mux_audio, mux_music = audio_path, background_music
+
+            # "Add text to existing video": a single upload long enough to use as-is
+            if len(media_files) == 1 and media_files[0].type.startswith('video'):
+                media_file = media_files[0]
+                temp_path = os.path.join(self.temp_dir, f"temp_{uuid.uuid4().hex[:8]}_{media_file.name}")
+                with open(temp_path, 'wb') as f:
+                    f.write(media_file.getvalue())
+                temp_files.append(temp_path)
+                if get_duration(temp_path) >= actual_duration - 0.05:
+                    source_path = temp_path
+                    # The narration is this upload's own soundtrack: keep its stream (0:a, copied)
+                    if (mux_audio and not (background_music and os.path.exists(background_music))
+                            and os.path.exists(mux_audio)
+                            and os.path.getsize(mux_audio) == os.path.getsize(temp_path)
+                            and hash_file(mux_audio) == hash_file(temp_path)):
+                        mux_audio = None
+
+            # Anything else: render the background once without text, then mux onto it
+            if source_path is None:
+                source_path = self._render_background(
+                    media_files, audio_path, duration, video_format, background_music, music_volume, render_backend
+                )
+                temp_files.append(source_path)
+                mux_audio, mux_music = None, None
+
+            copy_video = can_stream_copy(source_path)
+            timings = text_processor.create_punctuation_aware_karaoke(subtitle_text, actual_duration)
+            subtitle_path = os.path.join(self.temp_dir, f"karaoke_{uuid.uuid4().hex[:8]}.vtt")
+            with open(subtitle_path, 'w', encoding='utf-8') as f:
+                f.write(build_webvtt(timings))
+            temp_files.append(subtitle_path)
+
+            output_path = os.path.join(self.temp_dir, sanitize_filename(f"video_{uuid.uuid4().hex[:8]}.mp4"))
+            st.info(f"📦 Muxing subtitle track ({'stream copy' if copy_video else 're-encode'} video)...")
+            ffmpeg_renderer.mux_soft_subtitles(
+                source_path, subtitle_path, output_path, actual_duration,
+                copy_video=copy_video, audio_path=mux_audio, background_music=mux_music,
+                music_volume=music_volume, language=SUBTITLE_LANGUAGE_CODES.get(subtitle_language, 'und'),
+                source_has_audio=has_audio_stream(source_path),
+                video_args=ffmpeg_video_args(self.encode_profile, self._output_fps(STANDARD_FPS)),
+                audio_copy=self._unchanged_soundtrack(mux_audio, mux_music, actual_duration)
+            )
+        finally:
+            self._cleanup_clips([], temp_files)
+
+        elapsed = time.perf_counter() - start
+        self.job_report['subtitle_mode'] = {
+            'mode': 'soft',
+            'video_stream': 'copy' if copy_video else self.encode_profile,
+            'cues': len(timings),
+            'render_time': round(elapsed, 3),
+        }
+        st.success(f"✅ Soft-subtitle video created in {elapsed:.1f}s: {os.path.basename(output_path)}")
         return output_path
 
+    def _render_background(self, media_files, audio_path, duration, video_format,
+                           background_music, music_volume, render_backend='moviepy'):
+        """Render the job's video and audio without any text"""
+        if render_backend == 'ffmpeg':
+            return self._create_ffmpeg_video(
+                media_files, audio_path, duration, video_format, "", 60, 'white', 'middle',
+                background_music, music_volume
+            )
+        if media_files:
+            return self._create_standard_video(
+                media_files, audio_path, duration, video_format, "", 60, 'white', 'middle',
+                background_music, music_volume
+            )
+        return self._create_text_only_video(
+            audio_path, duration, video_format, "", 60, 'white', 'middle', background_music, music_volume
+        )
+
+    def render_subtitle_overlay(self, subtitle_text, duration, width, height, fps, font_size=60,
+                                text_color='white', text_position='middle', text_effect='none', timings=None):
+        """Karaoke layer alone as a cached alpha video (utils.subtitle_overlay.SubtitleOverlay)
+
+        Keyed by the timed script, style and geometry: a hit skips text rasterization entirely.
+        timings: karaoke timings already computed for subtitle_text and duration.
+        """
+        if timings is None:
+            timings = text_processor.create_punctuation_aware_karaoke(subtitle_text, duration)
+        style = (font_size, text_color, text_position, text_effect, self.word_atlas.font_name)
+        key = subtitle_overlay_renderer.overlay_key(
+            timings, style, width, height, fps, duration, self.overlay_codec
+        )
+        overlay = subtitle_overlay_renderer.get(key, self.overlay_codec)
+        if overlay:
+            st.info("♻️ Reusing the cached subtitle overlay")
+            return overlay
+
+        effect_config = get_text_effect_config(text_effect) or get_text_effect_config('none')
+        overlays = self._karaoke_overlays(
+            timings, width, height, font_size, text_color, text_position, duration, text_effect, effect_config
+        )
+        self.job_report['text_atlas'] = self.word_atlas.report()
+        st.info(f"🔤 Rendering {len(overlays)} karaoke segments into a transparent {self.overlay_codec} overlay...")
+        return subtitle_overlay_renderer.render(key, overlays, width, height, fps, duration, self.overlay_codec)
+
+    def _create_overlay_subtitle_video(self, media_files, audio_path, duration, video_format,
+                                       subtitle_text, font_size, text_color, text_position,
+                                       background_music, music_volume, text_effect='none',
+                                       render_backend='moviepy'):
+        """The reusable subtitle overlay laid over the job's timeline by the encoder of the final output
+
+        The background is never encoded on its own: the overlay is a second input of the
+        ffmpeg graph (ffmpeg backend, slideshows) or of the ffmpeg that encodes the piped
+        MoviePy frames, so the output takes one lossy encode, as burned-in karaoke does.
+        """
+        start = time.perf_counter()
+        width, height = get_frame_size(video_format, self.quality)
+        fps = self._output_fps(STANDARD_FPS if media_files else TEXT_ONLY_FPS)
+        actual_duration = self._sync_duration(audio_path, duration)
+
+        overlay_start = time.perf_counter()
+        overlay = self.render_subtitle_overlay(
+            subtitle_text, actual_duration, width, height, fps, font_size, text_color, text_position, text_effect
+        )
+        overlay_time = time.perf_counter() - overlay_start
+
+        st.info("🧩 Encoding the video with the subtitle overlay laid over it...")
+        if render_backend == 'ffmpeg':
+            output_path = self._create_ffmpeg_video(
+                media_files, audio_path, duration, video_format, "", font_size, text_color, text_position,
+                background_music, music_volume, text_effect, overlay=overlay
+            )
+        elif media_files:
+            output_path = self._create_standard_video(
+                media_files, audio_path, duration, video_format, subtitle_text, font_size, text_color,
+                text_position, background_music, music_volume, text_effect, overlay=overlay
+            )
+        else:
+            output_path = self._create_text_only_video(
+                audio_path, duration, video_format, subtitle_text, font_size, text_color, text_position,
+                background_music, music_volume, text_effect, overlay=overlay
+            )
+
+        elapsed = time.perf_counter() - start
+        self.job_report['subtitle_mode'] = {
+            'mode': 'overlay',
+            'overlay': overlay.report(),
+            'overlay_time': round(overlay_time, 3),
+            'render_time': round(elapsed, 3),
+        }
+        st.success(f"✅ Overlay-subtitle video created in {elapsed:.1f}s: {os.path.basename(output_path)}")
+        return output_path
+
+    def _cleanup_clips(self, clips, temp_files):
+        """Close clips and delete temporary files, ignoring errors"""
+        for clip in clips:
+            try:
+                clip.close()
+            except Exception:
+                pass
+        for temp_file in temp_files:
+            try:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+            except OSError:
+                pass
+
     def _loop_audio(self, audio_clip, target_duration):
-        """Loop audio to match target duration"""
-        loops_needed = int(target_duration / audio_clip.duration) + 1
-        clips = [audio_clip] * loops_needed
-        looped_audio = concatenate_audioclips(clips)
-        return looped_audio.subclip(0, target_duration)
+        """Loop audio to match target duration (t mod duration, optional seam crossfade)"""
+        return loop_audio(audio_clip, target_duration, crossfade=self.loop_crossfade)
 
     def _add_punctuation_aware_karaoke(self, video_clip, text, font_size, text_color, text_position, audio_duration, text_effect='none'):
         """Add punctuation-aware karaoke with text effects"""
@@ -348,81 +1229,79 @@ class VideoEditor:
                 st.warning(f"⚠️ Invalid text effect '{text_effect}', using default settings")
                 effect_config = get_text_effect_config('none')
 
-            # Calculate position based on video dimensions
-            if text_position == 'middle':
-                position = ('center', video_clip.h * 0.3)
-            else:
-                position = ('center', video_clip.h * 0.8)
-
-            text_clips = []
             # Get punctuation-aware timings
             timings = text_processor.create_punctuation_aware_karaoke(text, audio_duration)
             st.info(f"📊 Processing {len(timings)} karaoke segments with {effect_config['name']} effect")
+            overlays = self._karaoke_overlays(
+                timings, video_clip.w, video_clip.h, font_size, text_color, text_position,
+                audio_duration, text_effect, effect_config
+            )
 
-            for i, timing in enumerate(timings):
-                chunk_text = timing['text']
-                start_time = timing['start_time']
-                end_time = min(timing['end_time'], audio_duration)  # Ensure end_time doesn't exceed audio_duration
-                has_punctuation = timing['has_punctuation']
-                punctuation = timing.get('punctuation', '')
-
-                if start_time >= audio_duration:
-                    st.warning(f"⚠️ Skipping segment {i}: start_time {start_time}s exceeds audio duration {audio_duration}s")
-                    continue
-
-                try:
-                    # Apply effect settings with defaults
-                    stroke_color = effect_config.get('stroke_color', 'black')
-                    stroke_width = effect_config.get('stroke_width', 2)
-                    font_color = effect_config.get('font_color', text_color)
-
-                    # Apply special styling for punctuation with effects
-                    if has_punctuation and punctuation in ['.', '!', '?']:
-                        if text_effect == 'glow':
-                            font_color = effect_config.get('glow_color', '#FFD700')
-                        elif text_effect == 'neon':
-                            font_color = effect_config.get('neon_color', '#00FFFF')
-                        elif text_effect == 'fade':
-                            font_color = effect_config.get('fade_color', text_color)
-
-                    # Create text clip with effect settings
-                    txt_clip = TextClip(
-                        chunk_text,
-                        fontsize=font_size,
-                        color=font_color,
-                        font='Arial-Bold',
-                        stroke_color=stroke_color,
-                        stroke_width=stroke_width,
-                        size=(video_clip.w * 0.9, None),
-                        method='caption'
-                    ).set_position(position).set_start(start_time).set_duration(end_time - start_time)
-                    text_clips.append(txt_clip)
-
-                except Exception as e:
-                    st.warning(f"⚠️ Failed to create text clip for '{chunk_text}' at segment {i}: {str(e)}")
-                    continue
-
-            if not text_clips:
+            if not overlays:
                 st.warning("⚠️ No text clips created, falling back to normal subtitle")
                 return self._add_normal_subtitle(video_clip, text, font_size, text_color, text_position, text_effect)
 
-            # Composite video with text clips
-            st.info(f"🔄 Compositing {len(text_clips)} segments with {effect_config['name']} effect")
-            result = CompositeVideoClip([video_clip] + text_clips)
-
-            # Clean up text clips to prevent memory leaks
-            for txt_clip in text_clips:
-                try:
-                    txt_clip.close()
-                except:
-                    pass
+            atlas_report = self.word_atlas.report()
+            self.job_report['text_atlas'] = atlas_report
+            st.info(
+                f"🔤 Word atlas: {atlas_report['unique_bitmaps']} bitmaps for {atlas_report['segments']} segments "
+                f"in {atlas_report['render_time']:.2f}s (~{atlas_report['estimated_time_saved']:.1f}s saved vs TextClip)"
+            )
 
-            return result
+            # Single overlay clip: each frame looks up its active segments in the interval index
+            st.info(f"🔄 Compositing {len(overlays)} segments with {effect_config['name']} effect")
+            return overlay_clip(video_clip, overlays)
 
         except Exception as e:
             st.error(f"❌ Failed to create punctuation-aware karaoke: {str(e)}")
             return self._add_normal_subtitle(video_clip, text, font_size, text_color, text_position, text_effect)
 
+    def _karaoke_overlays(self, timings, width, height, font_size, text_color, text_position,
+                          audio_duration, text_effect, effect_config):
+        """(start, end, TextBitmap, position) per karaoke segment, rasterized through the word atlas"""
+        # Calculate position based on video dimensions
+        if text_position == 'middle':
+            position = ('center', height * 0.3)
+        else:
+            position = ('center', height * 0.8)
+
+        overlays = []
+        for i, timing in enumerate(timings):
+            chunk_text = timing['text']
+            start_time = timing['start_time']
+            end_time = min(timing['end_time'], audio_duration)  # Ensure end_time doesn't exceed audio_duration
+            has_punctuation = timing['has_punctuation']
+            punctuation = timing.get('punctuation', '')
+
+            if start_time >= audio_duration:
+                st.warning(f"⚠️ Skipping segment {i}: start_time {start_time}s exceeds audio duration {audio_duration}s")
+                continue
+
+            try:
+                # Apply effect settings with defaults
+                font_color = effect_config.get('font_color', text_color)
+
+                # Apply special styling for punctuation with effects
+                if has_punctuation and punctuation in ['.', '!', '?']:
+                    if text_effect == 'glow':
+                        font_color = effect_config.get('glow_color', '#FFD700')
+                    elif text_effect == 'neon':
+                        font_color = effect_config.get('neon_color', '#00FFFF')
+                    elif text_effect == 'fade':
+                        font_color = effect_config.get('fade_color', text_color)
+
+                # Rasterize once per unique word/style, then reuse the bitmap
+                bitmap = self.word_atlas.get(
+                    chunk_text, font_size, text_style(effect_config, font_color),
+                    max_width=width * 0.9
+                )
+                overlays.append((start_time, end_time, bitmap, position))
+
+            except Exception as e:
+                st.warning(f"⚠️ Failed to create text clip for '{chunk_text}' at segment {i}: {str(e)}")
+                continue
+        return overlays
+
     def _add_normal_subtitle(self, video_clip, text, font_size, text_color, text_position, text_effect='none'):
         """Add static subtitle with text effects"""
         try:
@@ -444,31 +1323,14 @@ class VideoEditor:
             optimized_lines = text_processor.optimize_for_display(text, max_line_length=25)
             display_text = '\n'.join(optimized_lines[:3])  # Limit to 3 lines
 
-            # Apply effect settings
-            stroke_color = effect_config.get('stroke_color', 'black')
-            stroke_width = effect_config.get('stroke_width', 2)
-            font_color = effect_config.get('font_color', text_color)
-
-            # Create text clip
-            txt_clip = TextClip(
-                display_text,
-                fontsize=font_size,
-                color=font_color,
-                font='Arial-Bold',
-                stroke_color=stroke_color,
-                stroke_width=stroke_width,
-                size=(video_clip.w * 0.9, None),
-                method='caption'
-            ).set_position(position).set_duration(video_clip.duration)
+            # Rasterize with the word atlas (no ImageMagick needed)
+            bitmap = self.word_atlas.get(
+                display_text, font_size, text_style(effect_config, effect_config.get('font_color', text_color)),
+                max_width=video_clip.w * 0.9
+            )
 
             # Composite video with subtitle
-            result = CompositeVideoClip([video_clip, txt_clip])
-
-            # Clean up text clip
-            try:
-                txt_clip.close()
-            except:
-                pass
+            result = overlay_clip(video_clip, [(0, video_clip.duration, bitmap, position)])
 
             st.success(f"✅ Static subtitle with {effect_config['name']} effect added")
             return result
@@ -478,11 +1340,8 @@ class VideoEditor:
             return video_clip
 
     def _loop_clip(self, clip, target_duration):
-        """Loop a clip to reach target duration"""
-        loops_needed = int(target_duration / clip.duration) + 1
-        clips = [clip] * loops_needed
-        looped_clip = concatenate_videoclips(clips, method="compose")
-        return looped_clip.subclip(0, target_duration)
+        """Loop a clip to reach target duration without concatenating copies"""
+        return loop_clip(clip, target_duration)
 
     def _create_fallback_video(self, media_files, audio_path, duration, video_format):
         """Create a fallback video when main processing fails"""
@@ -502,6 +1361,17 @@ class VideoEditor:
 
     def _create_simple_slideshow(self, image_files, duration, video_format):
         """Create a simple slideshow from images"""
+        # Every image gets an equal share of the duration in the ffmpeg slideshow engine
+        try:
+            width, height = get_frame_size(video_format, self.quality)
+            paths = [media_ingest.normalized_path(f, width, height, STANDARD_FPS)[0] for f in image_files]
+            return self._create_slideshow_video(
+                [(path, duration / len(paths)) for path in paths], None, duration, width, height, 1,
+                "", 60, 'white', 'middle', None, 0.3
+            )
+        except Exception as e:
+            st.warning(f"⚠️ Slideshow engine failed, trying MoviePy: {str(e)}")
+
         try:
             if not MOVIEPY_AVAILABLE:
                 return self._create_dummy_video(image_files, None, duration)
@@ -510,25 +1380,13 @@ class VideoEditor:
             images_to_use = image_files[:3]
             clips = []
             image_duration = duration / len(images_to_use)
-            temp_files = []
+            target_height = 1920 if video_format == 'short' else 1080
 
             for i, image_file in enumerate(images_to_use):
                 try:
-                    temp_path = os.path.join(self.temp_dir, f"temp_img_{uuid.uuid4().hex[:8]}_{image_file.name}")
-                    with open(temp_path, 'wb') as f:
-                        f.write(image_file.getvalue())
-
-                    # Create image clip
-                    clip = ImageClip(temp_path).set_duration(image_duration)
-
-                    # Resize
-                    if video_format == 'short':
-                        clip = clip.resize(height=1920)
-                    else:
-                        clip = clip.resize(height=1080)
-
-                    clips.append(clip)
-                    temp_files.append(temp_path)
+                    # Decoded from the upload buffer at the target height
+                    frame = decode_image(image_file.getvalue(), height=target_height)
+                    clips.append(ImageClip(frame).set_duration(image_duration))
 
                 except Exception as e:
                     st.warning(f"⚠️ Failed to process image {image_file.name}: {str(e)}")
@@ -542,10 +1400,13 @@ class VideoEditor:
 
             # Export
             output_path = os.path.join(self.temp_dir, f"video_slideshow_{uuid.uuid4().hex[:8]}.mp4")
-            final_clip.write_videofile(output_path, verbose=False, logger=None, fps=1)
+            final_clip.write_videofile(
+                output_path, verbose=False, logger=None, fps=1,
+                **moviepy_write_kwargs(self.encode_profile, 1, 'slideshow')
+            )
 
             # Cleanup
-            self._cleanup_clips([final_clip] + clips, temp_files)
+            self._cleanup_clips([final_clip] + clips, [])
 
             st.success("✅ Simple slideshow video created")
             return output_path
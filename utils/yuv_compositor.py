@@ -0,0 +1,164 @@
+"""
+yuv420p compositing over constant backgrounds: the background and every text bitmap are
+converted to Y/U/V planes once, so frames reach ffmpeg as yuv420p without a per-frame
+RGB -> YUV conversion
+"""
+import weakref
+
+import numpy as np
+from moviepy.video.VideoClip import ImageClip
+
+from utils.karaoke_overlay import KaraokeOverlayClip, SegmentIndex, blend_premultiplied
+
+# Bump when composited pixels change (blending, conversion, text rendering) so cached segments are not reused
+COMPOSITOR_VERSION = 1
+
+# BT.601 limited range, what swscale applies to rgb24 -> yuv420p by default
+_RGB_TO_YUV = (np.array([
+    [65.481, 128.553, 24.966],
+    [-37.797, -74.203, 112.0],
+    [112.0, -93.786, -18.214],
+]) / 255.0).T.astype('float32')
+_YUV_OFFSET = np.array([16.0, 128.0, 128.0], dtype='float32')
+
+# YUVBitmap per TextBitmap, converted on first use and dropped with the atlas
+_yuv_bitmaps = weakref.WeakKeyDictionary()
+
+
+def rgb_to_yuv(rgb):
+    """Full-resolution float32 (..., 3) Y, U, V values of an RGB uint8 array"""
+    return rgb.astype('float32') @ _RGB_TO_YUV + _YUV_OFFSET
+
+
+def subsample(plane):
+    """Mean over 2x2 blocks of an (h, w, ...) array with even h and w"""
+    height, width = plane.shape[:2]
+    return plane.reshape(height // 2, 2, width // 2, 2, *plane.shape[2:]).mean(axis=(1, 3))
+
+
+def background_planes(rgb):
+    """(Y plane, stacked U/V planes) of an RGB background, both uint8 and C-contiguous"""
+    yuv = rgb_to_yuv(np.asarray(rgb)[..., :3])
+    y_plane = np.rint(yuv[..., 0]).astype('uint8')
+    uv_planes = np.rint(subsample(yuv[..., 1:])).astype('uint8').transpose(2, 0, 1)
+    return y_plane, np.ascontiguousarray(uv_planes)
+
+
+class YUVBitmap:
+    """A TextBitmap's visible box as premultiplied yuv420p planes, widened to even coordinates"""
+
+    def __init__(self, bitmap):
+        left, top = bitmap.box
+        box_h, box_w = bitmap.premultiplied.shape[:2]
+        # Every 2x2 chroma block must lie entirely inside the box
+        x0, y0 = left & ~1, top & ~1
+        x1, y1 = (left + box_w + 1) & ~1, (top + box_h + 1) & ~1
+        rgb = np.zeros((y1 - y0, x1 - x0, 3), dtype='uint8')
+        alpha = np.zeros((y1 - y0, x1 - x0), dtype='uint16')
+        visible = bitmap.alpha[y0:y1, x0:x1]
+        rgb[:visible.shape[0], :visible.shape[1]] = bitmap.rgb[y0:y1, x0:x1]
+        alpha[:visible.shape[0], :visible.shape[1]] = visible
+        self.offset = (int(x0), int(y0))
+
+        yuv = np.rint(rgb_to_yuv(rgb)).astype('uint16')
+        self.y_premultiplied = yuv[..., 0] * alpha
+        self.y_inverse = 255 - alpha
+        # Chroma of a 2x2 block: mean alpha, and the alpha-weighted mean of U/V (premultiplied)
+        chroma_alpha = np.rint(subsample(alpha)).astype('uint16')
+        uv_premultiplied = np.rint(subsample(yuv[..., 1:] * alpha[..., None])).astype('uint16')
+        self.uv_premultiplied = np.ascontiguousarray(uv_premultiplied.transpose(2, 0, 1))
+        self.uv_inverse = 255 - chroma_alpha
+
+    @property
+    def shape(self):
+        return self.y_premultiplied.shape
+
+
+def yuv_bitmap(bitmap):
+    """YUVBitmap of a TextBitmap, converted once per bitmap"""
+    planes = _yuv_bitmaps.get(bitmap)
+    if planes is None:
+        planes = _yuv_bitmaps[bitmap] = YUVBitmap(bitmap)
+    return planes
+
+
+class ConstantSource:
+    """Decode stage for a constant background: the same planes for every frame"""
+
+    def __init__(self, planes):
+        self.planes = planes
+
+    def get_frame(self, t):
+        return self.planes
+
+
+class YUVOverlayClip(KaraokeOverlayClip):
+    """KaraokeOverlayClip over a still background that the frame pipeline writes as yuv420p
+
+    MoviePy writers still get RGB frames through the parent class.
+    """
+    pix_fmt = 'yuv420p'
+
+    def __init__(self, base_clip, overlays):
+        super().__init__(base_clip, overlays)
+        width, height = self.size
+        self.background = background_planes(base_clip.img)
+
+        placed = []
+        for start, end, bitmap, (x, y) in overlays:
+            if x == 'center':
+                x = (width - bitmap.w) // 2
+            planes = yuv_bitmap(bitmap)
+            left, top = planes.offset
+            # Chroma is shared by 2x2 pixels: snap to even coordinates (moves text at most 1px)
+            placed.append((start, end, (planes, (int(x) + left) & ~1, (int(y) + top) & ~1)))
+        self.yuv_index = SegmentIndex(placed)
+        # Flat buffer holding a text band's Y rows followed by its U and V rows
+        self.buffer_shape = (width * height * 3 // 2,)
+
+        box_h = max((p.shape[0] for _, _, (p, _, _) in placed), default=0)
+        box_w = max((p.shape[1] for _, _, (p, _, _) in placed), default=0)
+        self.y_scratch = np.empty((2, box_h, box_w), dtype='uint16')
+        self.uv_scratch = np.empty((2, box_h // 2, box_w // 2), dtype='uint16')
+
+    def pipeline_stages(self):
+        return ConstantSource(self.background), self.yuv_parts
+
+    def yuv_parts(self, background, t, out=None):
+        """yuv420p frame as blocks: background rows are views, only the text band rows of each plane are copied"""
+        y_plane, uv_planes = background
+        height, width = y_plane.shape
+        active = self.yuv_index.active(t)
+        top = max(0, min((y for _, _, y in active), default=0))
+        bottom = min(height, max((y + p.shape[0] for p, _, y in active), default=0))
+        if top >= bottom:
+            return [y_plane, uv_planes]
+
+        rows = bottom - top
+        if out is None:
+            out = np.empty(rows * width * 3 // 2, dtype='uint8')
+        y_band = out[:rows * width].reshape(rows, width)
+        uv_band = out[rows * width:rows * width * 3 // 2].reshape(2, rows // 2, width // 2)
+        np.copyto(y_band, y_plane[top:bottom])
+        np.copyto(uv_band, uv_planes[:, top // 2:bottom // 2])
+        for planes, x, y in active:
+            blend_premultiplied(y_band, planes.y_premultiplied, planes.y_inverse, x, y - top, self.y_scratch)
+            for channel in (0, 1):
+                blend_premultiplied(uv_band[channel], planes.uv_premultiplied[channel], planes.uv_inverse,
+                                    x // 2, (y - top) // 2, self.uv_scratch)
+
+        (u_plane, v_plane), chroma_top, chroma_bottom = uv_planes, top // 2, bottom // 2
+        parts = [
+            y_plane[:top], y_band, y_plane[bottom:],
+            u_plane[:chroma_top], uv_band[0], u_plane[chroma_bottom:],
+            v_plane[:chroma_top], uv_band[1], v_plane[chroma_bottom:],
+        ]
+        return [part for part in parts if part.size]
+
+
+def overlay_clip(base_clip, overlays):
+    """YUVOverlayClip when the base is a still, unmasked image of even size, else KaraokeOverlayClip"""
+    width, height = base_clip.size
+    if isinstance(base_clip, ImageClip) and base_clip.mask is None and width % 2 == 0 and height % 2 == 0:
+        return YUVOverlayClip(base_clip, overlays)
+    return KaraokeOverlayClip(base_clip, overlays)